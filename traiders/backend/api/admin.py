@@ -13,6 +13,7 @@ admin.site.register(Following)
 admin.site.register(Event)
 admin.site.register(Prediction)
 admin.site.register(ParitySetting)
+admin.site.register(BackfillJob)
 admin.site.register(Asset)
 admin.site.register(OnlineInvestment)
 admin.site.register(BuyOrder)
@@ -22,3 +23,4 @@ admin.site.register(Portfolio)
 admin.site.register(PortfolioItem)
 admin.site.register(Notification)
 admin.site.register(Alert)
+admin.site.register(RecommendationFeed)
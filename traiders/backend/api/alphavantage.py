@@ -1,18 +1,33 @@
 from urllib.parse import urljoin
-from django.utils.timezone import datetime, make_aware
+import csv
 import logging
 import os
 
-import requests as rq
+from .outbound import client
+from .ratelimit import KeyScheduler
+from .timeseries import TimeSeries, parse_dates, parse_time_series
 
 logger = logging.getLogger(__name__)
 
-ALPHA_VANTAGE_BASE_URL = 'https://www.alphavantage.co/'
+ALPHA_VANTAGE_BASE_URL = os.environ.get('ALPHA_VANTAGE_BASE_URL', 'https://www.alphavantage.co/')
 ALPHA_VANTAGE_CATEGORY_LIST_PATH = {
     'currency': 'physical_currency_list/',
     'crypto': 'digital_currency_list/'
 }
-ALPHA_VANTAGE_KEYS = os.environ.get('ALPHA_VANTAGE_KEYS', '').split(',')
+ALPHA_VANTAGE_KEYS = [key for key in os.environ.get('ALPHA_VANTAGE_KEYS', '').split(',') if key]
+
+# limits of a free API key
+ALPHA_VANTAGE_CALLS_PER_MINUTE = int(os.environ.get('ALPHA_VANTAGE_CALLS_PER_MINUTE', 5))
+ALPHA_VANTAGE_CALLS_PER_DAY = int(os.environ.get('ALPHA_VANTAGE_CALLS_PER_DAY', 500))
+
+# seconds a request waits for a key with remaining budget before giving up with QuotaError
+ALPHA_VANTAGE_MAX_WAIT = float(os.environ.get('ALPHA_VANTAGE_MAX_WAIT', 60))
+
+# budgets are shared by the server and the cron commands
+scheduler = KeyScheduler('alphavantage', ALPHA_VANTAGE_KEYS,
+                         budgets=[(ALPHA_VANTAGE_CALLS_PER_MINUTE, 60),
+                                  (ALPHA_VANTAGE_CALLS_PER_DAY, 24 * 60 * 60)],
+                         max_wait=ALPHA_VANTAGE_MAX_WAIT)
 
 
 class QuotaError(Exception):
@@ -41,40 +56,55 @@ def _handle_fetch_stock_equipments():
 
 
 def fetch_equipment_data(category):
+    """
+    yields the equipments of a category, the list is parsed while it is downloaded
+    """
     logger.info(f'fetching equipment data for "{category}"')
 
     if category == 'stock':  # AlphaVantage does not provide a list of stock symbols
-        return _handle_fetch_stock_equipments()
+        yield from _handle_fetch_stock_equipments()
+        return
 
     path = ALPHA_VANTAGE_CATEGORY_LIST_PATH[category]
     url = urljoin(ALPHA_VANTAGE_BASE_URL, path)
 
-    csv_text = rq.get(url).text
-    csv_lines = csv_text.splitlines()
+    with client.get(url, stream=True) as response:
+        if response.status_code != 200:
+            logger.error(f'"GET {response.url}" status={response.status_code}')
+            raise Exception
 
-    equipment_datas = []
+        response.encoding = response.encoding or 'utf-8-sig'
 
-    for line in csv_lines[1:]:
-        symbol, name = line.split(',')
+        # names may contain quoted commas
+        rows = csv.reader(response.iter_lines(decode_unicode=True))
+        next(rows, None)  # header
 
-        equipment_datas.append({
-            'symbol': symbol,
-            'name': name,
-            'category': category
-        })
+        for row in rows:
+            if len(row) < 2:
+                continue
 
-    return equipment_datas
+            yield {
+                'symbol': row[0],
+                'name': row[1],
+                'category': category
+            }
 
 
 def do_request(url, params):
     """
-    try API keys
+    make the request with a key that has remaining budget, see `scheduler`
     """
-    if not ALPHA_VANTAGE_KEYS:
+    if not scheduler.keys:
         raise NoKeys
 
-    for key in ALPHA_VANTAGE_KEYS:
-        response = rq.get(url, params={
+    # a key may still be rejected, e.g. if it was used by another process
+    for _ in scheduler.keys:
+        key = scheduler.acquire()
+
+        if key is None:  # spent all keys
+            break
+
+        response = client.get(url, params={
             **params,
             'apikey': key
         })
@@ -91,6 +121,7 @@ def do_request(url, params):
 
         if 'Note' in data and 'frequency' in data['Note']:  # quota restriction
             logger.info(f'"GET {response.url}" exceeded quota')
+            scheduler.exhausted(key, daily='per day' in data['Note'])
             continue
 
         return data
@@ -99,6 +130,18 @@ def do_request(url, params):
     raise QuotaError
 
 
+FOREX_KEYS = STOCK_KEYS = {
+    'open': '1. open',
+    'high': '2. high',
+    'low': '3. low',
+    'close': '4. close'
+}
+
+
+def _parse_last_refreshed(meta_data, key):
+    return parse_dates([meta_data[key]])[0]
+
+
 def _fetch_from_forex(base_symbol, target_symbol, outputsize):
     logger.info(f'fetching from forex')
 
@@ -113,27 +156,27 @@ def _fetch_from_forex(base_symbol, target_symbol, outputsize):
 
     data = do_request(url, params)
 
-    time_series = data['Time Series FX (Daily)']
+    parities = parse_time_series(data['Time Series FX (Daily)'], FOREX_KEYS)
+    last_updated = _parse_last_refreshed(data['Meta Data'], '5. Last Refreshed')
 
-    parities = []
+    return last_updated, parities
 
-    for date, rates in time_series.items():
-        parities.append({
-            'date': make_aware(datetime.strptime(date, '%Y-%m-%d')),
-            'open': rates['1. open'],
-            'high': rates['2. high'],
-            'low': rates['3. low'],
-            'close': rates['4. close']
-        })
 
-    try:
-        last_updated = datetime.strptime(data['Meta Data']['5. Last Refreshed'], '%Y-%m-%d %H:%M:%S')
-    except Exception:
-        last_updated = datetime.strptime(data['Meta Data']['5. Last Refreshed'], '%Y-%m-%d')
+def _digital_keys(time_series):
+    # keys contain the market, e.g. '1a. open (USD)'
+    rates = next(iter(time_series.values()), {})
 
-    last_updated = make_aware(last_updated)
+    keys = {}
+    for their_key in rates:
+        for our_key in TimeSeries.FIELDS:
+            if 'a. ' + our_key in their_key:
+                keys[our_key] = their_key
 
-    return last_updated, parities
+    if set(keys) != set(TimeSeries.FIELDS):
+        logger.error('values could not be found in response')
+        raise Exception('invalid response from AlphaVantage')
+
+    return keys
 
 
 def _fetch_from_digital(base_symbol, target_symbol, outputsize):
@@ -152,30 +195,8 @@ def _fetch_from_digital(base_symbol, target_symbol, outputsize):
 
     time_series = data['Time Series (Digital Currency Daily)']
 
-    parities = []
-
-    for date, rates in time_series.items():
-        parity = {
-            'date': make_aware(datetime.strptime(date, '%Y-%m-%d'))
-        }
-
-        for their_key, value in rates.items():
-            for our_key in ['open', 'close', 'high', 'low']:
-                if 'a. ' + our_key in their_key:
-                    parity[our_key] = value
-
-        if set(parity.keys()) != {'open', 'close', 'high', 'low', 'date'}:
-            logger.error('values could not be found in response')
-            raise Exception('invalid response from AlphaVantage')
-
-        parities.append(parity)
-
-    try:
-        last_updated = datetime.strptime(data['Meta Data']['6. Last Refreshed'], '%Y-%m-%d %H:%M:%S')
-    except Exception:
-        last_updated = datetime.strptime(data['Meta Data']['6. Last Refreshed'], '%Y-%m-%d')
-
-    last_updated = make_aware(last_updated)
+    parities = parse_time_series(time_series, _digital_keys(time_series))
+    last_updated = _parse_last_refreshed(data['Meta Data'], '6. Last Refreshed')
 
     return last_updated, parities
 
@@ -193,30 +214,16 @@ def _fetch_from_stock(symbol, outputsize):
 
     data = do_request(url, params)
 
-    time_series = data['Time Series (Daily)']
-
-    parities = []
-
-    for date, rates in time_series.items():
-        parities.append({
-            'date': make_aware(datetime.strptime(date, '%Y-%m-%d')),
-            'open': rates['1. open'],
-            'high': rates['2. high'],
-            'low': rates['3. low'],
-            'close': rates['4. close']
-        })
-
-    try:
-        last_updated = datetime.strptime(data['Meta Data']['3. Last Refreshed'], '%Y-%m-%d %H:%M:%S')
-    except Exception:
-        last_updated = datetime.strptime(data['Meta Data']['3. Last Refreshed'], '%Y-%m-%d')
-
-    last_updated = make_aware(last_updated)
+    parities = parse_time_series(data['Time Series (Daily)'], STOCK_KEYS)
+    last_updated = _parse_last_refreshed(data['Meta Data'], '3. Last Refreshed')
 
     return last_updated, parities
 
 
 def fetch_parities(base_symbol, base_category, target_symbol, target_category, outputsize):
+    """
+    returns the last refresh time and the parities as a TimeSeries
+    """
     logger.info(f'fetch_parities base={base_symbol} target={target_symbol}')
 
     # note: this is as far as alphavantage supports.
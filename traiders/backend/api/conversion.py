@@ -0,0 +1,238 @@
+import decimal
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import LatestParity
+
+# stamp of a pair loaded before its stamp was read, never equal to the stamp in the cache
+_UNREAD = object()
+
+
+class ConversionGraph:
+    """
+    Rates between any two connected equipments, through the latest parities.
+
+    Every quoted pair is an edge in both directions, the reverse one at the inverse rate
+    unless the reverse pair is quoted itself. A cross rate is the product of the rates on the
+    path with the fewest conversions. Paths are cached and kept until an edge is added or
+    removed; rates are read from the edges on every call, so a changed rate needs no
+    recomputation.
+
+    Changed pairs are re-read in this process on the next call. Other processes learn about them
+    from the shared cache, checking at most every `check_interval` seconds: a changed rate replaces
+    the stamp of its pair, and only the pairs with new stamps are re-read. Pairs added or removed
+    replace the version stamp of the graph instead, which is loaded again as a whole.
+    """
+
+    version_key = 'conversion-graph:version'
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._quotes = None  # (base pk, target pk) -> close of the latest parity
+        self._neighbors = {}  # pk -> pks it can be converted to directly
+        self._paths = {}  # (source pk, target pk) -> path of pks, None if not connected
+        self._changed = set()  # pairs to re-read
+        self._version = None
+        self._stamps = {}  # (base pk, target pk) -> stamp of the pair when it was read
+        self._checked_at = 0
+
+    @staticmethod
+    def _stamp_key(pair):
+        return 'conversion-graph:pair:%d:%d' % pair
+
+    def _read_stamps(self, pairs):
+        stamps = cache.get_many([self._stamp_key(pair) for pair in pairs])
+        return {pair: stamps.get(self._stamp_key(pair)) for pair in pairs}
+
+    def _connect(self, base, target):
+        if target not in self._neighbors.setdefault(base, set()):
+            self._neighbors[base].add(target)
+            self._neighbors.setdefault(target, set()).add(base)
+            self._paths.clear()
+
+    def _disconnect(self, base, target):
+        if (target, base) not in self._quotes and target in self._neighbors.get(base, ()):
+            self._neighbors[base].discard(target)
+            self._neighbors[target].discard(base)
+            self._paths.clear()
+
+    def _load(self):
+        # stamps are read before the rows, a rate changed in between is read again on the next check.
+        # pairs seen for the first time have no stamp read yet, they are read again as well
+        known = self._read_stamps(list(self._stamps))
+
+        self._quotes = {}
+        self._neighbors = {}
+        self._paths = {}
+        self._changed = set()
+        self._stamps = {}
+
+        for base, target, close in LatestParity.objects.values_list('base_equipment', 'target_equipment',
+                                                                    'parity__close'):
+            self._stamps[(base, target)] = known.get((base, target), _UNREAD)
+            if close:  # a zero rate has no inverse
+                self._quotes[(base, target)] = close
+                self._connect(base, target)
+
+    def _reload_changed(self):
+        stamps = self._read_stamps(list(self._changed))
+
+        pairs = Q()
+        for base, target in self._changed:
+            pairs |= Q(base_equipment=base, target_equipment=target)
+
+        quotes = {
+            (base, target): close
+            for base, target, close in LatestParity.objects.filter(pairs).values_list('base_equipment',
+                                                                                      'target_equipment',
+                                                                                      'parity__close')
+            if close
+        }
+
+        for pair in self._changed:
+            self._stamps[pair] = stamps[pair]
+
+            if pair in quotes:
+                self._quotes[pair] = quotes[pair]
+                self._connect(*pair)
+            elif pair in self._quotes:
+                del self._quotes[pair]
+                self._disconnect(*pair)
+
+        self._changed = set()
+
+    def _refresh(self):
+        now = time.monotonic()
+
+        if self._quotes is None or now - self._checked_at >= self.check_interval:
+            version = cache.get_or_set(self.version_key, uuid.uuid4().hex, None)
+            self._checked_at = now
+
+            if self._quotes is None or version != self._version:
+                self._version = version
+                self._load()
+            else:
+                stamps = self._read_stamps(list(self._stamps))
+                self._changed.update(pair for pair, stamp in stamps.items() if stamp != self._stamps[pair])
+
+        if self._changed:
+            self._reload_changed()
+
+    def _path(self, source, target):
+        key = (source, target)
+
+        if key not in self._paths:
+            # breadth first, neighbors in order of pks for the same path every time
+            previous = {source: None}
+            queue = deque([source])
+
+            while queue and target not in previous:
+                node = queue.popleft()
+                for neighbor in sorted(self._neighbors.get(node, ())):
+                    if neighbor not in previous:
+                        previous[neighbor] = node
+                        queue.append(neighbor)
+
+            path = None
+            if target in previous:
+                path = [target]
+                while previous[path[-1]] is not None:
+                    path.append(previous[path[-1]])
+                path.reverse()
+
+            self._paths[key] = path
+
+        return self._paths[key]
+
+    def _edge_rate(self, base, target):
+        if (base, target) in self._quotes:
+            return self._quotes[(base, target)]
+        return 1 / self._quotes[(target, base)]
+
+    def rates(self, sources, target):
+        """
+        source pk -> rate converting it to the `target` pk. Sources not connected to it are left out.
+        """
+        result = {}
+
+        with self._lock:
+            self._refresh()
+
+            for source in sources:
+                if source == target:
+                    result[source] = decimal.Decimal(1)
+                    continue
+
+                path = self._path(source, target)
+                if path is not None:
+                    rate = decimal.Decimal(1)
+                    for base, quote in zip(path, path[1:]):
+                        rate *= self._edge_rate(base, quote)
+                    result[source] = rate
+
+        return result
+
+    def rate(self, source, target):
+        """
+        Rate converting the `source` pk to the `target` pk, None if they are not connected
+        """
+        return self.rates([source], target).get(source)
+
+    def paths(self, sources, target):
+        """
+        source pk -> pks on the path from it to the `target` pk with the fewest conversions, e.g. to
+        convert with other rates than the latest ones. Sources not connected to it are left out.
+        """
+        result = {}
+
+        with self._lock:
+            self._refresh()
+
+            for source in sources:
+                path = self._path(source, target)
+                if path is not None:
+                    result[source] = list(path)
+
+        return result
+
+    def clear(self):
+        """
+        Forget the graph, it is loaded again on the next call
+        """
+        with self._lock:
+            self._quotes = None
+            self._neighbors = {}
+            self._paths = {}
+            self._changed = set()
+            self._stamps = {}
+
+    def pair_changed(self, base, target, added_or_removed=False):
+        """
+        Re-read a pair on the next call, and in other processes. Pairs added or removed
+        change the paths, the graph is loaded again in other processes.
+        """
+        def replace_stamp():
+            key = self.version_key if added_or_removed else self._stamp_key((base, target))
+            stamp = uuid.uuid4().hex
+            previous = cache.get(key)
+            cache.set(key, stamp, None)
+
+            with self._lock:
+                self._changed.add((base, target))
+                if added_or_removed and previous == self._version:  # up to date otherwise
+                    self._version = stamp
+
+        replace_stamp()
+
+        # read by another process before the commit, replace it again
+        transaction.on_commit(replace_stamp)
+
+
+graph = ConversionGraph()
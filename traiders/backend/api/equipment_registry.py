@@ -0,0 +1,119 @@
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Equipment
+
+
+class EquipmentRegistry:
+    """
+    Equipments by symbol and by pk, loaded once per process.
+
+    Equipments rarely change, so they are kept in memory instead of being read on every
+    request. Saves and deletes replace a version stamp in the shared cache, and other
+    processes reload when they see a new version, checking at most every `check_interval`
+    seconds. Symbols missing in the registry are looked up in the database, since they may
+    have been created by another process since the last check, and briefly remembered if
+    they are missing there too.
+
+    Returned equipments are shared between requests and should not be modified.
+    """
+
+    version_key = 'equipment-registry:version'
+    max_misses = 1000
+
+    def __init__(self, check_interval=5, miss_timeout=1):
+        self.check_interval = check_interval
+        self.miss_timeout = miss_timeout  # seconds a symbol or pk missing in the database is remembered
+        self._lock = threading.Lock()  # held only to swap the maps, never while reading them
+        self._state = None  # (version, by_symbol, by_pk)
+        self._checked_at = 0
+        self._misses = {}  # (field, value) -> until when it is known to be missing
+
+    def _maps(self):
+        state = self._state
+        now = time.monotonic()
+
+        if state is not None and now - self._checked_at < self.check_interval:
+            return state[1], state[2]
+
+        # other threads keep using the current maps while this one checks
+        self._checked_at = now
+
+        # read before loading, a change made while loading replaces it and is loaded next time
+        version = cache.get_or_set(self.version_key, uuid.uuid4().hex, None)
+
+        if state is None or version != state[0]:
+            equipments = list(Equipment.objects.all())
+            loaded = (version,
+                      {equipment.symbol: equipment for equipment in equipments},
+                      {equipment.pk: equipment for equipment in equipments})
+
+            with self._lock:
+                if self._state is state:  # not replaced by another thread meanwhile
+                    self._state = loaded
+                    self._misses = {}
+                state = self._state or loaded
+
+        return state[1], state[2]
+
+    def _lookup(self, field, value):
+        """
+        Equipment missing in the registry from the database, e.g. created by another process since the
+        last check. Missing ones are remembered for `miss_timeout` seconds.
+        """
+        key = (field, value)
+        now = time.monotonic()
+
+        if self._misses.get(key, 0) > now:
+            return None
+
+        equipment = Equipment.objects.filter(**{field: value}).first()
+
+        if equipment is None:
+            with self._lock:
+                if len(self._misses) >= self.max_misses:
+                    self._misses = {}
+                self._misses[key] = now + self.miss_timeout
+
+        return equipment
+
+    def get(self, symbol):
+        """
+        Equipment with the symbol, None if there is none
+        """
+        by_symbol, _ = self._maps()
+        equipment = by_symbol.get(symbol)
+
+        if equipment is None:
+            equipment = self._lookup('symbol', symbol)
+
+        return equipment
+
+    def get_by_pk(self, pk):
+        _, by_pk = self._maps()
+        equipment = by_pk.get(pk)
+
+        if equipment is None:
+            equipment = self._lookup('pk', pk)
+
+        return equipment
+
+    def invalidate(self):
+        def replace_version():
+            cache.set(self.version_key, uuid.uuid4().hex, None)
+
+            with self._lock:
+                self._state = None
+                self._misses = {}
+
+        replace_version()
+
+        # reloaded by another process before the commit, replace it again
+        transaction.on_commit(replace_version)
+
+
+equipments = EquipmentRegistry()
@@ -0,0 +1,160 @@
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Parity, LatestParity, ParitySetting, BackfillJob
+from . import alphavantage as av
+from . import response_cache
+
+logger = logging.getLogger(__name__)
+
+# postponement after the first quota error, doubled with every attempt
+BACKFILL_RETRY_DELAY = timezone.timedelta(minutes=1)
+BACKFILL_MAX_RETRY_DELAY = timezone.timedelta(hours=1)
+
+# a running job is taken over when its worker seems to be dead
+BACKFILL_STALE_AFTER = timezone.timedelta(minutes=30)
+
+
+@transaction.atomic
+def ingest_history(ps, last_updated, parities, batch_size=None):
+    """
+    Insert the fetched history (a TimeSeries) of a parity setting with bulk inserts,
+    returns the number of inserted parities.
+
+    Parity signals are deliberately not sent, backfilled history is not a tick:
+    orders, alerts and predictions are handled by the next tick of the pair.
+    Batches are as large as the database allows unless `batch_size` is given.
+    """
+    start = time.perf_counter()
+
+    base_id = ps.base_equipment_id
+    target_id = ps.target_equipment_id
+
+    # parities that are already stored (e.g. ticks received before the backfill) are kept
+    existing_dates = set(Parity.objects.filter(base_equipment_id=base_id,
+                                               target_equipment_id=target_id,
+                                               date__gte=ps.from_date).values_list('date', flat=True))
+
+    rows = [
+        Parity(base_equipment_id=base_id, target_equipment_id=target_id,
+               date=date, open=open, high=high, low=low, close=close)
+        for date, open, high, low, close in zip(parities.date, parities.open, parities.high,
+                                                parities.low, parities.close)
+        if date >= ps.from_date and date not in existing_dates  # ignore older than from_date
+    ]
+
+    Parity.objects.bulk_create(rows, batch_size=batch_size)
+    LatestParity.refresh(base_id, target_id)
+
+    if rows:  # closes of past days, which valuations cache
+        response_cache.valuations.invalidate()
+
+    ps.last_updated = last_updated
+    ps.save(update_fields=['last_updated'])
+
+    elapsed = time.perf_counter() - start
+    logger.info(f'ingested {len(rows)} parities of {ps} in {elapsed:.2f}s '
+                f'({len(rows) / max(elapsed, 1e-6):.0f} rows/s)')
+
+    return len(rows)
+
+
+def enqueue_backfills():
+    """
+    Create the jobs of the settings that were created without one (e.g. with bulk_create)
+    """
+    missing = ParitySetting.objects.filter(backfill_job__isnull=True)
+
+    # backfilled before the jobs
+    missing.filter(last_updated__isnull=False, status=ParitySetting.PENDING).update(status=ParitySetting.DONE)
+
+    BackfillJob.objects.bulk_create([
+        BackfillJob(parity_setting=ps) for ps in missing.filter(last_updated__isnull=True)
+    ])
+
+
+@transaction.atomic
+def claim_backfill():
+    """
+    Mark the next runnable job as running and return it, or None.
+    Locked rows are skipped, so workers do not block each other.
+    """
+    now = timezone.now()
+
+    pending = Q(parity_setting__status=ParitySetting.PENDING, run_after__lte=now)
+    stale = Q(parity_setting__status=ParitySetting.RUNNING, started_at__lt=now - BACKFILL_STALE_AFTER)
+
+    job = (
+        BackfillJob.objects
+                   .select_for_update(skip_locked=True, of=('self',))
+                   .select_related('parity_setting__base_equipment', 'parity_setting__target_equipment')
+                   .filter(pending | stale)
+                   .order_by('run_after', 'pk')
+                   .first()
+    )
+
+    if job is None:
+        return None
+
+    job.attempts += 1
+    job.started_at = now
+    job.finished_at = None
+    job.save()
+
+    ps = job.parity_setting
+    ps.status = ParitySetting.RUNNING
+    ps.save(update_fields=['status'])
+
+    return job
+
+
+def run_backfill(job):
+    """
+    Fetch and ingest the history of a claimed job.
+    Quota errors postpone the job, other errors fail it.
+    """
+    ps = job.parity_setting
+    base_eq = ps.base_equipment
+    target_eq = ps.target_equipment
+
+    logger.info(f'backfilling {ps}, attempt {job.attempts}')
+
+    try:
+        last_updated, parities = av.fetch_parities(base_eq.symbol, base_eq.category,
+                                                   target_eq.symbol, target_eq.category,
+                                                   outputsize='full')
+
+        job.fetched = len(parities)
+        job.save(update_fields=['fetched'])
+
+        with transaction.atomic():
+            job.inserted = ingest_history(ps, last_updated, parities)
+            job.finished_at = timezone.now()
+            job.error = ''
+            job.save()
+
+            ps.status = ParitySetting.DONE
+            ps.save(update_fields=['status'])
+    except av.QuotaError as e:
+        delay = min(BACKFILL_RETRY_DELAY * 2 ** (job.attempts - 1), BACKFILL_MAX_RETRY_DELAY)
+        logger.warning(f'quota exceed when backfilling {ps}, retrying in {delay}')
+
+        job.run_after = timezone.now() + delay
+        job.error = str(e)
+        job.save()
+
+        ps.status = ParitySetting.PENDING
+        ps.save(update_fields=['status'])
+    except Exception as e:
+        logger.error(f'backfilling {ps} failed: {e}', exc_info=True)
+
+        job.finished_at = timezone.now()
+        job.error = str(e)
+        job.save()
+
+        ps.status = ParitySetting.FAILED
+        ps.save(update_fields=['status'])
@@ -0,0 +1,203 @@
+import statistics
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from django.utils.timezone import datetime, make_aware
+from rest_framework.test import APIClient
+
+from ...models import *
+from ... import alphavantage as av
+from ...timeseries import parse_time_series
+from ...serializers.memo import NestedMemoMixin
+from ... import search_index
+
+
+class Command(BaseCommand):
+    help = 'Measures query counts and latencies of endpoints on generated data. ' \
+           'Generated data is rolled back afterwards.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('benchmark', choices=['paritylatest', 'timeseries', 'paritylist', 'articlelist', 'search'])
+        parser.add_argument('--sizes', nargs='+', type=int, default=[50, 500, 5000],
+                            help='Sizes of the generated data')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Number of measurements for each size')
+
+    def handle(self, *args, **options):
+        benchmark = getattr(self, f'benchmark_{options["benchmark"]}')
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                benchmark(size, options['repeat'])
+                transaction.set_rollback(True)
+
+    def _measure(self, title, repeat, func):
+        durations = []
+
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                func()
+                durations.append(time.perf_counter() - start)
+
+        self.stdout.write(f'{title:<40} queries={len(queries):<6} '
+                          f'median={statistics.median(durations) * 1000:.1f}ms '
+                          f'min={min(durations) * 1000:.1f}ms')
+
+    def _get(self, path, params=None):
+        def func():
+            with override_settings(ALLOWED_HOSTS=['*']):
+                response = APIClient().get(path, params)
+            assert response.status_code == 200, response.status_code
+
+        return func
+
+    @staticmethod
+    def _create_equipments(count):
+        Equipment.objects.bulk_create([
+            Equipment(symbol=f'BENCH{i}', name=f'Benchmark Equipment {i}', category='currency')
+            for i in range(count)
+        ])
+
+        # read back for primary keys
+        return list(Equipment.objects.filter(symbol__startswith='BENCH'))
+
+    def benchmark_paritylatest(self, size, repeat):
+        # n equipments make n * (n - 1) pairs
+        count = 2
+        while count * (count - 1) < size:
+            count += 1
+
+        equipments = self._create_equipments(count)
+        pairs = [(base, target) for base in equipments for target in equipments if base != target][:size]
+
+        # two days of history for each pair. bulk_create skips the signals, so
+        # neither orders nor alerts are handled, and the latest parities are created below
+        now = timezone.now()
+        Parity.objects.bulk_create([
+            Parity(base_equipment=base, target_equipment=target, open=1, close=1, high=1, low=1, date=date)
+            for base, target in pairs
+            for date in [now - timezone.timedelta(days=1), now]
+        ])
+        ParitySetting.objects.bulk_create([
+            ParitySetting(base_equipment=base, target_equipment=target, update_rate=timezone.timedelta(hours=1),
+                          from_date=now, order=i % 10)
+            for i, (base, target) in enumerate(pairs)
+        ])
+
+        latest = {}
+        for pk, base_id, target_id in Parity.objects.order_by('date').values_list('pk', 'base_equipment', 'target_equipment'):
+            latest[(base_id, target_id)] = pk
+
+        LatestParity.objects.bulk_create([
+            LatestParity(base_equipment_id=base_id, target_equipment_id=target_id, parity_id=pk)
+            for (base_id, target_id), pk in latest.items()
+        ])
+
+        self.stdout.write(f'{len(pairs)} pairs')
+        self._measure('GET /parity/latest/', repeat, self._get('/parity/latest/'))
+        self._measure('GET /parity/latest/?limit=20', repeat, self._get('/parity/latest/', {'limit': 20}))
+
+    @staticmethod
+    def _parse_per_row(time_series):
+        # parsing of a digital currency response before TimeSeries, for comparison
+        parities = []
+
+        for date, rates in time_series.items():
+            parity = {
+                'date': make_aware(datetime.strptime(date, '%Y-%m-%d'))
+            }
+
+            for their_key, value in rates.items():
+                for our_key in ['open', 'close', 'high', 'low']:
+                    if 'a. ' + our_key in their_key:
+                        parity[our_key] = value
+
+            if set(parity.keys()) != {'open', 'close', 'high', 'low', 'date'}:
+                raise Exception('invalid response from AlphaVantage')
+
+            parities.append(parity)
+
+        return parities
+
+    def benchmark_timeseries(self, size, repeat):
+        # `size` days of a digital currency response, e.g. --sizes 7300 for outputsize=full of 20 years
+        today = timezone.now().date()
+        time_series = {}
+
+        for i in range(size):
+            price = f'{7000 + i % 500}.{i % 10000:04d}'
+            time_series[str(today - timezone.timedelta(days=i))] = {
+                **{f'{n}{m}. {field} (USD)': price
+                   for n, field in enumerate(['open', 'high', 'low', 'close'], start=1) for m in 'ab'},
+                '5. volume': str(i),
+                '6. market cap (USD)': str(i)
+            }
+
+        self.stdout.write(f'{size} days')
+        self._measure('per row', repeat, lambda: self._parse_per_row(time_series))
+        self._measure('TimeSeries', repeat, lambda: parse_time_series(time_series, av._digital_keys(time_series)))
+
+    def _measure_memo(self, title, repeat, func):
+        self._measure(title, repeat, func)
+
+        # nested users and equipments rendered for every row, for comparison
+        def render(serializer, instance):
+            return super(NestedMemoMixin, serializer).to_representation(instance)
+
+        with mock.patch.object(NestedMemoMixin, 'to_representation', render):
+            self._measure(title + ' (no memo)', repeat, func)
+
+    def benchmark_paritylist(self, size, repeat):
+        # `size` parities of 10 pairs, a page renders each of the 5 equipments once
+        equipments = self._create_equipments(5)
+        pairs = [(base, target) for base in equipments for target in equipments if base != target][:10]
+
+        now = timezone.now()
+        Parity.objects.bulk_create([
+            Parity(base_equipment=base, target_equipment=target, open=1, close=1, high=1, low=1,
+                   date=now - timezone.timedelta(days=i))
+            for i in range(size // len(pairs) + 1)
+            for base, target in pairs
+        ][:size])
+
+        self.stdout.write(f'{size} parities')
+        self._measure_memo('GET /parity/?limit=100', repeat, self._get('/parity/', {'limit': 100}))
+
+    def benchmark_articlelist(self, size, repeat):
+        # `size` articles of 10 authors
+        authors = [User.objects.create(username=f'bench_author{i}', email=f'bench_author{i}@example.com',
+                                       country='TR')
+                   for i in range(10)]
+
+        Article.objects.bulk_create([
+            Article(author=authors[i % len(authors)], title=f'Benchmark article {i}', content='Content')
+            for i in range(size)
+        ])
+
+        self.stdout.write(f'{size} articles')
+        self._measure_memo('GET /articles/?limit=100', repeat, self._get('/articles/', {'limit': 100}))
+
+    def benchmark_search(self, size, repeat):
+        # `size` articles of 10 authors with different words, indexed like the search signals would
+        authors = [User.objects.create(username=f'bench_author{i}', email=f'bench_author{i}@example.com',
+                                       country='TR')
+                   for i in range(10)]
+
+        Article.objects.bulk_create([
+            Article(author=authors[i % len(authors)], title=f'Benchmark article {i} word{i % 100}',
+                    content=f'Content of the article about topic{i % 1000}')
+            for i in range(size)
+        ])
+        search_index.index_objects(Article, list(Article.objects.filter(author__in=authors)))
+
+        self.stdout.write(f'{size} articles, {SearchTerm.objects.count()} terms')
+        self._measure('GET /search/?keyword=word42', repeat, self._get('/search/', {'keyword': 'word42'}))
+
+        if connection.vendor == 'postgresql':
+            # the prefix match should be an index scan on api_searchterm_term_like
+            self.stdout.write(SearchTerm.objects.filter(entity='article', term__startswith='word42').explain())
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from ...recommendations import build_feeds
+
+
+class Command(BaseCommand):
+    help = 'Builds the recommendation feeds of users whose interests changed, or that were requested when missing or stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=None,
+                            help='Also rebuild the feeds built more than this many minutes ago. '
+                                 'Stale feeds are otherwise rebuilt after they are requested')
+
+    def handle(self, *args, **options):
+        older_than = options['older_than']
+        if older_than is not None:
+            older_than = timedelta(minutes=older_than)
+
+        count = build_feeds(older_than)
+        self.stdout.write(f'{count} recommendation feeds built')
@@ -0,0 +1,28 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...synonyms import WORD_LIST_PATH, build_index
+
+
+class Command(BaseCommand):
+    help = 'Builds the related word index of search from a word list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=WORD_LIST_PATH,
+                            help='Word list, a group of related words per line')
+        parser.add_argument('--output', default=settings.SYNONYM_INDEX_PATH)
+
+    def handle(self, *args, **options):
+        with open(options['source']) as f:
+            index = build_index(f)
+
+        # replaced at once, running processes may be reading it
+        tmp_path = options['output'] + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, options['output'])
+
+        self.stdout.write(f'{len(index)} words indexed in {options["output"]}')
@@ -5,6 +5,9 @@ from django.db import transaction
 
 from ...models import Equipment
 from ... import alphavantage as av
+from ... import search_index
+from ... import response_cache
+from ...equipment_registry import equipments as equipment_registry
 
 logger = logging.getLogger(__name__)
 
@@ -14,13 +17,34 @@ class Command(BaseCommand):
 
     @transaction.atomic
     def handle(self, *args, **options):
+        symbols = set(Equipment.objects.values_list('symbol', flat=True))
+        name_length = Equipment._meta.get_field('name').max_length
+
+        equipments = []
+
         for category in ['currency', 'crypto', 'stock']:
             try:
-                equipment_datas = av.fetch_equipment_data(category)
+                for data in av.fetch_equipment_data(category):
+                    if data['symbol'] in symbols:  # a symbol may be listed in more than one category
+                        continue
+
+                    symbols.add(data['symbol'])
+                    equipments.append(Equipment(symbol=data['symbol'],
+                                                name=data['name'][:name_length],
+                                                category=data['category']))
             except Exception as e:
                 raise CommandError(f'Problem when fetching {category}')
 
-            for data in equipment_datas:
-                if not Equipment.objects.filter(symbol=data['symbol']).exists():
-                    eq = Equipment.objects.create(**data)
-                    logger.info(f'equipment created: {eq}')
+        # symbols may have been created by another process meanwhile
+        Equipment.objects.bulk_create(equipments, ignore_conflicts=True)  # batched by the database backend
+        logger.info(f'{len(equipments)} equipments created')
+
+        if not equipments:
+            return
+
+        # bulk_create skips the post_save handlers of equipments, and does not return their pks here
+        created = Equipment.objects.filter(symbol__in=[equipment.symbol for equipment in equipments])
+        search_index.index_objects(Equipment, list(created))
+
+        equipment_registry.invalidate()
+        response_cache.latest_parities.invalidate()
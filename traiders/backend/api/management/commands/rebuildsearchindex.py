@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ... import search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search index, e.g. after objects are created with bulk_create'
+
+    def handle(self, *args, **options):
+        search_index.rebuild()
+        self.stdout.write('search index is rebuilt')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from ...models import Article, ArticleComment, EquipmentComment
+
+
+class Command(BaseCommand):
+    help = 'Repairs the like counts of articles and comments, e.g. after likes are deleted with their users'
+
+    # model -> relation of its likes
+    counted = [
+        (Article, 'like'),
+        (ArticleComment, 'liked_by'),
+        (EquipmentComment, 'liked_by'),
+    ]
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model, relation in self.counted:
+            drifted = (
+                model.objects
+                     .annotate(actual=Count(relation))
+                     .exclude(like_count=F('actual'))
+                     .values_list('pk', 'actual')
+            )
+
+            objects = [model(pk=pk, like_count=actual) for pk, actual in drifted]
+            model.objects.bulk_update(objects, ['like_count'], batch_size=500)
+
+            self.stdout.write(f'{len(objects)} {model._meta.verbose_name_plural} repaired')
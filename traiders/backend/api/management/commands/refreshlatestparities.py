@@ -0,0 +1,21 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models import Parity, LatestParity
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the latest parity of every pair from the parity history'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        pairs = Parity.objects.order_by().values_list('base_equipment', 'target_equipment').distinct()
+
+        for base_id, target_id in pairs:
+            LatestParity.refresh(base_id, target_id)
+
+        logger.info(f'latest parities of {len(pairs)} pairs are refreshed')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...history import enqueue_backfills, claim_backfill, run_backfill
+
+
+class Command(BaseCommand):
+    help = 'Runs the pending history backfills of parity settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit after running the pending backfills')
+        parser.add_argument('--interval', type=float, default=10,
+                            help='Seconds to wait before looking for new backfills')
+
+    def handle(self, *args, **options):
+        while True:
+            enqueue_backfills()
+
+            job = claim_backfill()
+            while job is not None:
+                run_backfill(job)
+                job = claim_backfill()
+
+            if options['once']:
+                return
+
+            time.sleep(options['interval'])
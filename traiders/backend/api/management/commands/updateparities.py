@@ -1,4 +1,6 @@
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
@@ -6,44 +8,85 @@ from django.utils import timezone
 
 from ...models import ParitySetting, Parity
 from ... import alphavantage as av
+from ... import outbound
 
 logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
-    help = 'Fetches up-to-date parities from AlphaVantage'
+    help = 'Fetches up-to-date parities from AlphaVantage. ' \
+           'Parity settings are skipped until their history is backfilled by runbackfills.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Number of parallel requests to AlphaVantage (number of API keys by default)')
 
-    @transaction.atomic
     def handle(self, *args, **options):
         now = timezone.now()
+        concurrency = options['concurrency'] or len(av.ALPHA_VANTAGE_KEYS) or 1
+
+        if concurrency < 1:
+            raise CommandError('concurrency must be positive')
+
+        # settings without last_updated are not backfilled yet
+        backfilled = ParitySetting.objects.filter(last_updated__isnull=False)
+
+        settings = [
+            ps for ps in backfilled.select_related('base_equipment', 'target_equipment')
+            if ps.last_updated + ps.update_rate <= now  # dont update yet
+        ]
+
+        quota_exceeded = threading.Event()
 
-        for ps in ParitySetting.objects.all():
-            if ps.last_updated and ps.last_updated + ps.update_rate > now:  # dont update yet
-                continue
+        def fetch(ps):
+            # runs in the pool, without touching the database
+            if quota_exceeded.is_set():
+                return None
 
             base_eq = ps.base_equipment
             target_eq = ps.target_equipment
 
             try:
-                last_updated, parities = av.fetch_parities(base_eq.symbol, base_eq.category,
-                                                           target_eq.symbol, target_eq.category,
-                                                           outputsize='compact')
-            except av.QuotaError as e:
+                return av.fetch_parities(base_eq.symbol, base_eq.category,
+                                         target_eq.symbol, target_eq.category,
+                                         outputsize='compact')
+            except av.QuotaError:
                 logger.error(f'quota exceed when updating {base_eq}/{target_eq}')
-                return
+                quota_exceeded.set()
+            except Exception as e:
+                logger.error(f'updating {base_eq}/{target_eq} failed: {e}', exc_info=True)
 
-            recent_parity_data = parities[0]
-            del recent_parity_data['date']
+            return None
+
+        # parities are written by this thread as they arrive, each pair in its own transaction
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(fetch, ps): ps for ps in settings}
+
+            for future in as_completed(futures):
+                result = future.result()
+
+                if result is not None:
+                    last_updated, parities = result
+                    self._save_parity(futures[future], now, last_updated, parities)
+
+        logger.info(f'AlphaVantage budgets: {av.scheduler.metrics()}')
+        logger.info(f'outbound requests: {outbound.client.metrics()}')
+
+    @staticmethod
+    @transaction.atomic
+    def _save_parity(ps, now, last_updated, parities):
+        recent_parity_data = parities.row(0)
+        del recent_parity_data['date']
 
-            parity, created = Parity.objects.update_or_create(
-                defaults=recent_parity_data,
-                base_equipment=base_eq, target_equipment=target_eq, date=last_updated
-            )
+        parity, created = Parity.objects.update_or_create(
+            defaults=recent_parity_data,
+            base_equipment=ps.base_equipment, target_equipment=ps.target_equipment, date=last_updated
+        )
 
-            if created:
-                logger.info(f'{parity} created')
-            else:
-                logger.info(f'{parity} updated')
+        if created:
+            logger.info(f'{parity} created')
+        else:
+            logger.info(f'{parity} updated')
 
-            ps.last_updated = now
-            ps.save()
+        ps.last_updated = now
+        ps.save()
@@ -1,6 +1,6 @@
 from .equipment import Equipment
 from .investment import ManualInvestment, Asset, OnlineInvestment
-from .parity import Parity
+from .parity import Parity, LatestParity
 from .users import User
 from .article import Article
 from .comment import ArticleComment, EquipmentComment
@@ -10,7 +10,9 @@ from .following import Following
 from .portfolio import Portfolio, PortfolioItem
 from .event import Event
 from .prediction import Prediction
-from .parity_setting import ParitySetting
+from .parity_setting import ParitySetting, BackfillJob
 from .order import BuyOrder, StopLossOrder
 from .notification import Notification
 from .alert import Alert
+from .search import SearchTerm
+from .recommendation import RecommendationFeed, Recommendation
@@ -11,6 +11,7 @@ class Article(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     content = models.TextField(blank=False, max_length=10000)
     image = models.ImageField(blank=True)
+    like_count = models.PositiveIntegerField(default=0)  # likes, kept up to date by the like paths
 
     class Meta:
         ordering = ['-created_at']  # newest article comes first
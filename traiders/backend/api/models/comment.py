@@ -9,6 +9,7 @@ class CommentBase(models.Model):
     content = models.TextField(blank=True, max_length=400)
     image = models.ImageField(blank=True)
     liked_by = models.ManyToManyField(User, related_name='+')
+    like_count = models.PositiveIntegerField(default=0)  # of liked_by, kept up to date by the serializer
 
     class Meta:
         abstract = True  # django wont create any table for this model
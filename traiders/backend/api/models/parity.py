@@ -28,3 +28,65 @@ class Parity(models.Model):
 
     class Meta:
         ordering = ['-date']  # newest parity comes first
+        indexes = [
+            models.Index(fields=['base_equipment', 'target_equipment', '-date']),
+        ]
+
+
+class LatestParity(models.Model):
+    """
+    Points to the newest parity of each (base_equipment, target_equipment).
+    Kept up to date by the parity signals.
+    """
+    base_equipment = models.ForeignKey(Equipment,
+                                       on_delete=models.CASCADE,
+                                       related_name='+')
+
+    target_equipment = models.ForeignKey(Equipment,
+                                         on_delete=models.CASCADE,
+                                         related_name='+')
+
+    parity = models.OneToOneField(Parity,
+                                  on_delete=models.CASCADE,
+                                  related_name='+')
+
+    @staticmethod
+    def refresh(base_equipment, target_equipment):
+        """
+        Materialize the latest parity of a pair from its history
+        """
+        parity = (
+            Parity.objects
+                  .order_by('-date')
+                  .filter(base_equipment=base_equipment, target_equipment=target_equipment)
+                  .first()
+        )
+
+        if parity is None:
+            LatestParity.objects.filter(base_equipment=base_equipment, target_equipment=target_equipment).delete()
+        else:
+            LatestParity.objects.update_or_create(base_equipment_id=parity.base_equipment_id,
+                                                  target_equipment_id=parity.target_equipment_id,
+                                                  defaults={'parity': parity})
+
+        return parity
+
+    @staticmethod
+    def get_parity(base_equipment, target_equipment):
+        """
+        Latest parity of a pair or None
+        """
+        latest = (
+            LatestParity.objects
+                        .select_related('parity')
+                        .filter(base_equipment=base_equipment, target_equipment=target_equipment)
+                        .first()
+        )
+
+        if latest is None:  # not materialized yet
+            return LatestParity.refresh(base_equipment, target_equipment)
+
+        return latest.parity
+
+    class Meta:
+        unique_together = ('base_equipment', 'target_equipment')
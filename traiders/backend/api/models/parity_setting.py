@@ -1,9 +1,21 @@
 from django.db import models
+from django.utils import timezone
 
 from . import Equipment
 
 
 class ParitySetting(models.Model):
+    PENDING = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
     base_equipment = models.ForeignKey(Equipment,
                                        on_delete=models.CASCADE,
                                        blank=False,
@@ -20,5 +32,30 @@ class ParitySetting(models.Model):
 
     order = models.IntegerField(blank=False, default=0)
 
+    # status of the history backfill, set back to pending to retry a failed one
+    status = models.IntegerField(choices=STATUS_CHOICES, default=PENDING)
+
     def __str__(self):
         return "/".join([self.base_equipment.symbol, self.target_equipment.symbol])
+
+
+class BackfillJob(models.Model):
+    """
+    Fetching the history of a parity setting, run by the `runbackfills` worker
+    """
+    parity_setting = models.OneToOneField(ParitySetting,
+                                          on_delete=models.CASCADE,
+                                          related_name='backfill_job')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)  # postponed after quota errors
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    attempts = models.IntegerField(default=0)
+    fetched = models.IntegerField(default=0)  # number of parities in the history
+    inserted = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f'backfill of {self.parity_setting}'
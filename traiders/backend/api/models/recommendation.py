@@ -0,0 +1,27 @@
+from django.db import models
+from .users import User
+
+
+class RecommendationFeed(models.Model):
+    """
+    State of the recommendation feed of a user. See api/recommendations.py
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='recommendation_feed')
+    dirty = models.BooleanField(default=True)  # interests of the user changed since the last build
+    built_at = models.DateTimeField(null=True, blank=True)
+
+
+class Recommendation(models.Model):
+    """
+    An object recommended to a user, with the reasons separated by new lines
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    entity = models.CharField(max_length=32)  # key of the response, e.g. "articles"
+    object_id = models.IntegerField()
+    messages = models.TextField()
+    score = models.IntegerField()  # number of reasons
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'entity', '-score']),
+        ]
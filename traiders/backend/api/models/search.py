@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class SearchTerm(models.Model):
+    """
+    Inverted index of search, a term of an object with its weight. See api/search_index.py
+    """
+    entity = models.CharField(max_length=32)  # model name
+    object_id = models.IntegerField()
+    term = models.CharField(max_length=64)
+    weight = models.FloatField()
+
+    class Meta:
+        indexes = [
+            # terms are matched by their beginning (LIKE 'term%'), which needs the pattern operator
+            # class on PostgreSQL unless the database uses the C collation. ignored by other databases
+            models.Index(fields=['entity', 'term'], name='api_searchterm_term_like',
+                         opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']),
+            models.Index(fields=['entity', 'object_id']),
+        ]
@@ -0,0 +1,137 @@
+import bisect
+import logging
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import BuyOrder, StopLossOrder
+
+logger = logging.getLogger(__name__)
+
+
+class _Side:
+    """
+    Orders of one parity, sorted by their ratio
+    """
+
+    def __init__(self, version):
+        self.entries = []  # sorted (ratio, pk) pairs
+        self.ratios = {}  # pk -> ratio
+        self.version = version  # version stamp of the orders of the parity when loaded
+
+    def add(self, pk, ratio):
+        self.remove(pk)
+        bisect.insort(self.entries, (ratio, pk))
+        self.ratios[pk] = ratio
+
+    def remove(self, pk):
+        ratio = self.ratios.pop(pk, None)
+        if ratio is None:
+            return
+
+        index = bisect.bisect_left(self.entries, (ratio, pk))
+        del self.entries[index]
+
+    def above(self, ratio):
+        index = bisect.bisect_right(self.entries, (ratio, float('inf')))
+        return [pk for _, pk in self.entries[index:]]
+
+    def below(self, ratio):
+        index = bisect.bisect_left(self.entries, (ratio, float('-inf')))
+        return [pk for _, pk in self.entries[:index]]
+
+
+class OrderBook:
+    """
+    Keeps the orders of a model in memory, per (base_equipment, target_equipment).
+
+    A parity is loaded from the database the first time it ticks and is kept in sync
+    by the order signals afterwards. Since orders can also be changed by other processes
+    (web workers while `updateparities` is running), every change replaces a version
+    stamp of the parity in the shared cache. A tick only reads the stamp, and loads the
+    parity again if it was changed by another process. Changes that skip the signals
+    (queryset updates) are not seen until another change of the parity.
+    """
+
+    def __init__(self, model, ratio_field):
+        self.model = model
+        self.ratio_field = ratio_field
+        self._sides = {}
+        self._lock = threading.Lock()
+
+    def _version_key(self, base_id, target_id):
+        return f'orderbook:{self.model._meta.model_name}:{base_id}:{target_id}'
+
+    def _get_side(self, base_id, target_id):
+        side = self._sides.get((base_id, target_id))
+        version = cache.get_or_set(self._version_key(base_id, target_id), uuid.uuid4().hex, None)
+
+        if side is None or side.version != version:
+            logger.info(f'loading {self.model.__name__} book for parity {base_id}/{target_id}')
+            side = _Side(version)
+
+            orders = self.model.objects.filter(base_equipment_id=base_id, target_equipment_id=target_id)
+            for pk, ratio in orders.values_list('pk', self.ratio_field):
+                side.add(pk, ratio)
+
+            self._sides[(base_id, target_id)] = side
+
+        return side
+
+    def _changed(self, order, update):
+        """
+        Apply a change of an order to the loaded side of its parity, and replace the version
+        stamp of the parity so that other processes load it again
+        """
+        key = (order.base_equipment_id, order.target_equipment_id)
+
+        def replace_version():
+            version = uuid.uuid4().hex
+            previous = cache.get(self._version_key(*key))
+            cache.set(self._version_key(*key), version, None)
+
+            with self._lock:
+                side = self._sides.get(key)
+                if side is not None and side.version == previous:  # up to date otherwise, loaded on the next tick
+                    side.version = version
+
+        with self._lock:
+            side = self._sides.get(key)
+            if side is not None:  # not loaded yet, the order will be read when the parity ticks
+                update(side)
+
+        replace_version()
+
+        # loaded by another process before the commit, replace it again
+        transaction.on_commit(replace_version)
+
+    def add(self, order):
+        ratio = self.model._meta.get_field(self.ratio_field).to_python(getattr(order, self.ratio_field))
+        self._changed(order, lambda side: side.add(order.pk, ratio))
+
+    def remove(self, order):
+        self._changed(order, lambda side: side.remove(order.pk))
+
+    def above(self, base_id, target_id, ratio):
+        """
+        pks of the orders whose ratio is greater than `ratio`
+        """
+        with self._lock:
+            return self._get_side(base_id, target_id).above(ratio)
+
+    def below(self, base_id, target_id, ratio):
+        """
+        pks of the orders whose ratio is less than `ratio`
+        """
+        with self._lock:
+            return self._get_side(base_id, target_id).below(ratio)
+
+    def clear(self):
+        with self._lock:
+            self._sides = {}
+
+
+buy_orders = OrderBook(BuyOrder, 'buy_ratio')
+stoploss_orders = OrderBook(StopLossOrder, 'sell_ratio')
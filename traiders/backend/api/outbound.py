@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests as rq
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) seconds, read is the time between bytes rather than the whole response
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+class CircuitOpenError(rq.ConnectionError):
+    def __init__(self, host):
+        super().__init__(f'circuit of {host} is open')
+
+
+class _Host:
+    """
+    Counters and circuit state of a host
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = 0.0  # total seconds
+        self.max_latency = 0.0
+        self.consecutive_failures = 0
+        self.opened_at = None  # when the circuit was opened, None if closed
+
+
+class Client:
+    """
+    Makes outbound HTTP requests through a shared session.
+
+    Connections are kept alive in a pool per host, requests time out, and idempotent
+    requests are retried with backoff on connection errors and 502/503/504.
+    After `failure_threshold` consecutive failures the circuit of a host opens:
+    requests fail immediately with CircuitOpenError for `reset_timeout` seconds,
+    after which a request is let through to try the host again.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=2, backoff_factor=0.3,
+                 failure_threshold=5, reset_timeout=30, pool_maxsize=32):
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                      raise_on_status=False)  # the last response is returned after retries
+
+        # pool_maxsize is per host, enough for the threads of `updateparities`
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
+
+        self.session = rq.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _Host()
+            return host, self._hosts[host]
+
+    def _check_circuit(self, host, state):
+        with self._lock:
+            if state.opened_at is None:
+                return
+
+            if time.monotonic() - state.opened_at < self.reset_timeout:
+                raise CircuitOpenError(host)
+
+            # half open, this request tries the host. others fail until it finishes
+            state.opened_at = time.monotonic()
+
+    def _record(self, host, state, latency, failed):
+        with self._lock:
+            state.requests += 1
+            state.latency += latency
+            state.max_latency = max(state.max_latency, latency)
+
+            if not failed:
+                state.consecutive_failures = 0
+                state.opened_at = None
+                return
+
+            state.errors += 1
+            state.consecutive_failures += 1
+
+            if state.consecutive_failures >= self.failure_threshold:
+                if state.opened_at is None:
+                    logger.warning(f'opening the circuit of {host} after {state.consecutive_failures} failures')
+                state.opened_at = time.monotonic()
+
+    def request(self, method, url, **kwargs):
+        host, state = self._host(url)
+        self._check_circuit(host, state)
+
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.monotonic()
+
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except rq.RequestException:
+            self._record(host, state, time.monotonic() - start, failed=True)
+            raise
+
+        self._record(host, state, time.monotonic() - start, failed=response.status_code >= 500)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                host: {
+                    'requests': state.requests,
+                    'errors': state.errors,
+                    'mean_latency': round(state.latency / state.requests, 3) if state.requests else None,
+                    'max_latency': round(state.max_latency, 3),
+                    'circuit': 'closed' if state.opened_at is None else 'open'
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+# for background jobs, e.g. AlphaVantage
+client = Client()
+
+# for calls made while responding to a request, gunicorn workers should not wait long for other services
+interactive_client = Client(timeout=(1, 3), retries=1, pool_maxsize=8)
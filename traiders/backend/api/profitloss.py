@@ -0,0 +1,50 @@
+import decimal
+
+from .models import LatestParity
+from .conversion import graph
+
+
+def conversion_rates(equipment_ids, equipment):
+    """
+    equipment pk -> latest rate converting it to `equipment`. Direct rates are read in one query,
+    the others are cross rates of the conversion graph. Equipments not connected to `equipment`
+    are left out.
+    """
+    rates = dict(
+        LatestParity.objects
+                    .filter(base_equipment__in=equipment_ids, target_equipment=equipment)
+                    .values_list('base_equipment', 'parity__close')
+    )
+    rates[equipment.pk] = decimal.Decimal(1)
+
+    missing = set(equipment_ids) - rates.keys()
+    if missing:
+        rates.update(graph.rates(missing, equipment.pk))
+
+    return rates
+
+
+def profits(investments, equipment):
+    """
+    Profits of investments in terms of an equipment at the latest rates: the worth of the bought
+    amount now minus the worth of the sold amount now. Returns (profits, missing) where profits are
+    in the order of the investments, None for the ones with an equipment not connected to
+    `equipment`, and missing are the pks of those equipments.
+    """
+    equipment_ids = set()
+    for investment in investments:
+        equipment_ids.update([investment.base_equipment_id, investment.target_equipment_id])
+
+    rates = conversion_rates(equipment_ids, equipment)
+
+    result = []
+    for investment in investments:
+        base_rate = rates.get(investment.base_equipment_id)
+        target_rate = rates.get(investment.target_equipment_id)
+
+        if base_rate is None or target_rate is None:
+            result.append(None)
+        else:
+            result.append(investment.target_amount * target_rate - investment.base_amount * base_rate)
+
+    return result, equipment_ids - rates.keys()
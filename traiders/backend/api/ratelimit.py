@@ -0,0 +1,163 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+
+class TokenBuckets:
+    """
+    Token buckets of an API key, one per budget, each holding up to `capacity` tokens refilled
+    continuously over `period` seconds.
+
+    The tokens are kept in the default cache, so every process using the key spends the same
+    budgets. They are changed under a lock taken with `cache.add`, which only one process succeeds in.
+    """
+
+    # seconds after which the lock of a process that died holding it is released
+    LOCK_TIMEOUT = 5
+
+    def __init__(self, name, budgets):
+        self.budgets = list(budgets)
+        self._key = f'ratelimit:{name}'
+        # buckets left alone for the longest period are full, as if they were not cached
+        self._timeout = max((period for capacity, period in self.budgets), default=0) + 1
+
+    def _load(self):
+        now = time.time()
+        state = cache.get(self._key)
+
+        if state is None:
+            return [capacity for capacity, period in self.budgets], now
+
+        tokens, updated = state
+        return [min(capacity, count + (now - updated) * capacity / period)
+                for count, (capacity, period) in zip(tokens, self.budgets)], now
+
+    def _save(self, tokens, now):
+        cache.set(self._key, (tokens, now), self._timeout)
+
+    @contextmanager
+    def _locked(self):
+        lock = self._key + ':lock'
+        while not cache.add(lock, True, self.LOCK_TIMEOUT):
+            time.sleep(0.005)
+
+        try:
+            yield
+        finally:
+            cache.delete(lock)
+
+    def remaining(self):
+        tokens, now = self._load()
+        return tokens
+
+    def wait_time(self):
+        """
+        seconds until every bucket has a token
+        """
+        return max((max(0.0, (1 - count) * period / capacity)
+                    for count, (capacity, period) in zip(self.remaining(), self.budgets)), default=0.0)
+
+    def take(self):
+        """
+        Takes a token from every bucket, or returns False if a bucket has none, e.g. another process took it
+        """
+        with self._locked():
+            tokens, now = self._load()
+            if any(count < 1 for count in tokens):
+                return False
+
+            self._save([count - 1 for count in tokens], now)
+            return True
+
+    def empty(self, periods):
+        """
+        empties the buckets of the budgets with the periods
+        """
+        with self._locked():
+            tokens, now = self._load()
+            self._save([0 if period in periods else count for count, (capacity, period) in zip(tokens, self.budgets)],
+                       now)
+
+
+class KeyScheduler:
+    """
+    Schedules requests over API keys, each limited by a set of budgets, e.g. [(5, 60), (500, 24 * 60 * 60)]
+    for 5 calls per minute and 500 calls per day.
+
+    A request takes a token from every bucket of the key with the most remaining budget.
+    When all keys are spent, requests wait for a token up to `max_wait` seconds.
+    Budgets are shared by the schedulers of the same name in every process (see `TokenBuckets`),
+    the API may still report a key as exhausted when it is used elsewhere (see `exhausted`).
+    """
+
+    def __init__(self, name, keys, budgets, max_wait):
+        self.keys = list(keys)
+        self.max_wait = max_wait
+        self._buckets = {
+            # keys are not kept in the cache as they are
+            key: TokenBuckets(f'{name}:{hashlib.md5(key.encode()).hexdigest()}', budgets) for key in self.keys
+        }
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.queued = 0  # requests that had to wait for a token
+        self.wait_time = 0.0
+
+    def acquire(self):
+        """
+        Returns a key to make a request with, or None if no key will have budget in `max_wait` seconds
+        """
+        waited = 0.0
+
+        while True:
+            wait_times = {key: self._buckets[key].wait_time() for key in self.keys}
+            ready = [key for key in self.keys if wait_times[key] == 0]
+
+            for key in sorted(ready, key=lambda key: self._buckets[key].remaining(), reverse=True):
+                if not self._buckets[key].take():
+                    continue
+
+                with self._lock:
+                    self.requests += 1
+                    if waited:
+                        self.queued += 1
+                        self.wait_time += waited
+
+                return key
+
+            # when the ready keys were taken by other processes in the meantime, this looks again at once
+            wait = min(wait_times.values(), default=0.0)
+            if not self.keys or waited + wait > self.max_wait:
+                return None
+
+            time.sleep(wait)
+            waited += wait
+
+    def exhausted(self, key, daily=False):
+        """
+        The API rejected a request of the key, spend the budgets of the key.
+        Only the shortest budget is spent, unless `daily` is set.
+        """
+        periods = sorted(period for capacity, period in self._buckets[key].budgets)
+        self._buckets[key].empty(periods if daily else periods[:1])
+
+    def metrics(self):
+        with self._lock:
+            requests, queued, wait_time = self.requests, self.queued, self.wait_time
+
+        return {
+            'requests': requests,
+            'queued': queued,
+            'wait_time': round(wait_time, 3),
+            'keys': [
+                {
+                    'key': f'{key[:4]}***',
+                    'remaining': [int(tokens) for tokens in self._buckets[key].remaining()],
+                    'wait_time': round(self._buckets[key].wait_time(), 3)
+                }
+                for key in self.keys
+            ]
+        }
@@ -0,0 +1,164 @@
+import logging
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import *
+from . import search_index
+
+logger = logging.getLogger(__name__)
+
+MAX_ITEMS = 5  # per keyword and type
+MAX_FEED_ITEMS = 50  # per type
+
+# feeds requested after this long are built again, to include new content
+STALE_AFTER = timezone.timedelta(hours=1)
+
+PREDICTION_MSG = "You are receiving this since you made a prediction about {}/{} in the past."
+PORTFOLIO_MSG = "You are receiving this since you have {}/{} in one of your portfolios."
+INVESTMENT_MSG = "You are receiving this since you have an investment on {}/{} parity in the past."
+ARTICLE_MSG = "You are receiving this since you have an article on {}"
+EVENT_MSG = "You are receiving this since you are following {} event"
+FOLLOWING_MSG = "You are receiving this since you follow {}"
+
+
+def _interests(user):
+    """
+    keyword -> reasons to recommend the objects matching it
+    """
+    keywords = {}
+
+    def add(keyword, msg):
+        if keyword:
+            keywords.setdefault(keyword, []).append(msg)
+
+    def add_pair(obj, message):
+        msg = message.format(obj.base_equipment.symbol, obj.target_equipment.symbol)
+        add(obj.base_equipment.name, msg)
+        add(obj.target_equipment.name, msg)
+
+    pair = ('base_equipment', 'target_equipment')
+
+    for prediction in Prediction.objects.filter(user=user).select_related(*pair):
+        add_pair(prediction, PREDICTION_MSG)
+
+    for item in PortfolioItem.objects.filter(portfolio__user=user).select_related(*pair):
+        add_pair(item, PORTFOLIO_MSG)
+
+    investments = chain(OnlineInvestment.objects.filter(user=user).select_related(*pair),
+                        ManualInvestment.objects.filter(user=user).select_related(*pair))
+    for investment in investments:
+        add_pair(investment, INVESTMENT_MSG)
+
+    for title in Article.objects.filter(author=user).values_list('title', flat=True):
+        for word in title.split(" "):
+            add(word, ARTICLE_MSG.format(title))
+
+    for title in Event.objects.filter(followed_by=user).values_list('event', flat=True):
+        for word in title.split(" "):
+            add(word, EVENT_MSG.format(title))
+
+    for username in Following.objects.filter(user_following=user).values_list('user_followed__username', flat=True):
+        add(username, FOLLOWING_MSG.format(username))
+
+    return keywords
+
+
+def _matches(keywords, own_article_pks):
+    """
+    entity -> keyword -> pks of the objects matching the keyword, with a constant number of queries
+    on databases with window functions and a query per keyword and type otherwise, see `search_each`
+    """
+    equipments = search_index.search_each(Equipment, keywords, MAX_ITEMS)
+
+    # latest quotes of the pairs of the matching equipments, attributed to the keywords afterwards
+    equipment_pks = set(chain.from_iterable(equipments.values()))
+    q_pair = Q(base_equipment__in=equipment_pks) | Q(target_equipment__in=equipment_pks)
+    pairs = list(LatestParity.objects.filter(q_pair)
+                                     .order_by('parity')
+                                     .values_list('parity', 'base_equipment', 'target_equipment'))
+
+    parities = {}
+    for keyword, pks in equipments.items():
+        pks = set(pks)
+        parities[keyword] = [parity for parity, base, target in pairs if base in pks or target in pks][:MAX_ITEMS]
+
+    return {
+        'articles': search_index.search_each(Article, keywords, MAX_ITEMS, exclude=own_article_pks),
+        'events': search_index.search_each(Event, keywords, MAX_ITEMS),
+        'users': search_index.search_each(User, keywords, MAX_ITEMS),
+        'equipments': equipments,
+        'parities': parities,
+    }
+
+
+def build_feed(user):
+    """
+    Recommend the objects matching the interests of a user, replacing the feed of the user
+    """
+    # marked clean before reading, so interests changing while building mark the feed again
+    RecommendationFeed.objects.update_or_create(user=user, defaults={'dirty': False})
+
+    own_article_pks = Article.objects.filter(author=user).values('pk')
+    interests = _interests(user)
+    reasons = {}  # (entity, pk) -> messages
+
+    for entity, matches in _matches(list(interests), own_article_pks).items():
+        for keyword, pks in matches.items():
+            for pk in pks:
+                reasons.setdefault((entity, pk), []).extend(interests[keyword])
+
+    # the objects with the most reasons of each type
+    ranked = sorted(reasons.items(), key=lambda item: -len(item[1]))
+    counts = {}
+    rows = []
+    for (entity, pk), msgs in ranked:
+        counts[entity] = counts.get(entity, 0) + 1
+        if counts[entity] <= MAX_FEED_ITEMS:
+            rows.append(Recommendation(user=user, entity=entity, object_id=pk,
+                                       messages='\n'.join(dict.fromkeys(msgs)), score=len(msgs)))
+
+    with transaction.atomic():
+        # locks the feed, concurrent builds of a user are applied one by one
+        RecommendationFeed.objects.filter(user=user).update(built_at=timezone.now())
+        Recommendation.objects.filter(user=user).delete()
+        Recommendation.objects.bulk_create(rows)
+
+    return len(rows)
+
+
+def build_feeds(older_than=None):
+    """
+    Build the feeds marked dirty, and the ones built more than `older_than` ago to include new content
+    """
+    stale = Q(dirty=True)
+    if older_than is not None:
+        stale |= Q(built_at__lt=timezone.now() - older_than)
+
+    count = 0
+    for feed in RecommendationFeed.objects.filter(stale).select_related('user'):
+        build_feed(feed.user)
+        count += 1
+
+    return count
+
+
+def request_feed(user):
+    """
+    A user requested the feed, mark it to be built by the next run of `buildrecommendations`
+    if it was never built or was built more than STALE_AFTER ago. The feed is served as it is meanwhile.
+    """
+    feed, created = RecommendationFeed.objects.get_or_create(user=user)  # created dirty
+
+    if not feed.dirty and (feed.built_at is None or feed.built_at < timezone.now() - STALE_AFTER):
+        mark_dirty([user.pk])
+
+
+def mark_dirty(user_ids):
+    """
+    Rebuild the feeds of the users in the next run of `buildrecommendations`.
+    Users without a feed get one when they first request it, see `request_feed`.
+    """
+    RecommendationFeed.objects.filter(user_id__in=user_ids, dirty=False).update(dirty=True)
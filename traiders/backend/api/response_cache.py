@@ -0,0 +1,93 @@
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ResponseCache:
+    """
+    Caches the data of responses in the default cache, with an ETag for conditional requests.
+
+    Every cached response belongs to a scope (e.g. a user). Responses of a scope are
+    invalidated together by replacing the version stamp of the scope, so nothing
+    has to be deleted one by one. Invalidating the default scope invalidates every scope.
+    The cache backend has to be shared between processes that invalidate and the ones
+    that respond, e.g. the cron commands and the web workers (see CACHES in settings).
+    """
+
+    def __init__(self, name, timeout=60 * 60):
+        self.name = name
+        self.timeout = timeout
+
+    def _version_key(self, scope):
+        return f'{self.name}:version:{scope}'
+
+    def _version(self, scope):
+        return cache.get_or_set(self._version_key(scope), uuid.uuid4().hex, None)
+
+    def _key(self, identifier, scope):
+        versions = [self._version('')]
+        if scope != '':
+            versions.append(self._version(scope))
+
+        return ':'.join([
+            self.name,
+            str(scope),
+            *versions,
+            hashlib.md5(json.dumps(identifier).encode()).hexdigest()
+        ])
+
+    def invalidate(self, scope=''):
+        def replace_version():
+            cache.set(self._version_key(scope), uuid.uuid4().hex, None)
+
+        replace_version()
+
+        # a response built by another process before the commit would be stale, replace it again
+        transaction.on_commit(replace_version)
+
+    def cached(self, identifier, build, scope=''):
+        """
+        Value cached for the identifier (e.g. parameters) in the scope, or the value returned by
+        `build` after caching it. For data that is not a response, such as parts of responses.
+        """
+        key = self._key(identifier, scope)
+        value = cache.get(key)
+
+        if value is None:
+            value = build()
+            cache.set(key, value, self.timeout)
+
+        return value
+
+    def respond(self, request, build, scope=''):
+        """
+        Respond with the cached data, or with the data returned by `build` after caching it.
+        """
+        def build_with_etag():
+            data = build()
+            return '"%s"' % hashlib.md5(json.dumps(data, cls=JSONEncoder).encode()).hexdigest(), data
+
+        # every parameter is kept in the urls of responses (e.g. next and previous pages),
+        # the order of the parameters does not change the response
+        params = sorted(request.query_params.lists())
+        identifier = [request.build_absolute_uri('/'), params]  # urls in responses are absolute
+
+        etag, data = self.cached(identifier, build_with_etag, scope)
+
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        return Response(data, headers={'ETag': etag})
+
+
+latest_parities = ResponseCache('parity-latest')
+
+# past days of valuation series, see api/valuation.py
+valuations = ResponseCache('valuation', timeout=24 * 60 * 60)
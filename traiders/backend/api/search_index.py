@@ -0,0 +1,241 @@
+import logging
+import re
+
+from django.db import transaction, connection
+from django.db.models import Case, When, Value, F, Sum, Q, FloatField, IntegerField, Window
+from django.db.models.functions import RowNumber
+
+from .models import Article, Event, Equipment, User, SearchTerm
+
+logger = logging.getLogger(__name__)
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+# tokens of keywords matched by search_each, which are words of titles rather than typed searches
+MIN_KEYWORD_TOKEN_LENGTH = 3
+STOP_WORDS = {'the', 'and', 'for', 'with', 'from', 'into', 'about', 'after', 'before', 'over', 'under',
+              'are', 'was', 'were', 'has', 'have', 'had', 'its', 'this', 'that', 'these', 'those',
+              'will', 'not', 'but', 'all', 'our', 'your', 'their', 'than'}
+
+# (attribute, weight, substrings) of the indexed models. substrings of identifiers are
+# indexed as well (e.g. "nyc" of "investorNYC"), other terms match from their beginning
+SEARCH_FIELDS = {
+    Article: [('title', 3, False), ('content', 1, False), ('author.username', 2, True)],
+    Event: [('event', 3, False), ('category', 2, False), ('country.code', 1, True), ('country.name', 1, False)],
+    Equipment: [('symbol', 3, True), ('name', 2, True)],
+    User: [('username', 3, True), ('first_name', 2, False), ('last_name', 2, False)],
+}
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in re.findall(r'\w+', str(text).lower())
+            if len(token) >= MIN_TERM_LENGTH]
+
+
+def _entity(model):
+    return model._meta.model_name
+
+
+def indexed_fields(model):
+    """
+    names of the fields of a model its search terms depend on, e.g. "author" of "author.username"
+    """
+    return {attribute.split('.')[0] for attribute, weight, substrings in SEARCH_FIELDS[model]}
+
+
+def _get_attribute(instance, attribute):
+    for name in attribute.split('.'):
+        instance = getattr(instance, name, None)
+        if instance is None:
+            return ''
+    return instance
+
+
+def _terms(instance):
+    """
+    term -> weight of an instance, weights of the fields containing the term are summed
+    """
+    terms = {}
+
+    for attribute, weight, substrings in SEARCH_FIELDS[type(instance)]:
+        for token in tokenize(_get_attribute(instance, attribute)):
+            if substrings:
+                variants = {token[i:] for i in range(len(token) - MIN_TERM_LENGTH + 1)}
+            else:
+                variants = {token}
+
+            for term in variants:
+                terms[term] = terms.get(term, 0) + weight
+
+    return terms
+
+
+@transaction.atomic
+def index_objects(model, instances):
+    entity = _entity(model)
+    SearchTerm.objects.filter(entity=entity, object_id__in=[instance.pk for instance in instances]).delete()
+
+    SearchTerm.objects.bulk_create([
+        SearchTerm(entity=entity, object_id=instance.pk, term=term, weight=weight)
+        for instance in instances
+        for term, weight in _terms(instance).items()
+    ])  # batch size is chosen by the database backend, SQLite limits compound selects to 500 rows
+
+
+def index_object(instance):
+    index_objects(type(instance), [instance])
+
+
+def remove_object(instance):
+    SearchTerm.objects.filter(entity=_entity(type(instance)), object_id=instance.pk).delete()
+
+
+def rebuild(batch_size=500):
+    """
+    Index all objects of the indexed models from scratch
+    """
+    SearchTerm.objects.all().delete()
+
+    for model in SEARCH_FIELDS:
+        queryset = model.objects.order_by('pk')
+        if model is Article:
+            queryset = queryset.select_related('author')
+
+        count = 0
+        last_pk = 0
+        while True:
+            instances = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not instances:
+                break
+
+            index_objects(model, instances)
+            count += len(instances)
+            last_pk = instances[-1].pk
+
+        logger.info(f'{count} {model._meta.verbose_name_plural} indexed')
+
+
+def search(model, keywords, limit, offset=0):
+    """
+    pks of the objects of a model matching the (score, keyword) pairs, the most relevant first.
+    Objects are ranked by the weights of their matching terms, times the scores of the keywords.
+    """
+    scores = {}
+    for score, keyword in keywords:
+        for token in tokenize(keyword):
+            scores[token] = max(scores.get(token, 0), score)
+
+    if not scores:
+        return []
+
+    # a term takes the score of the best keyword it starts with
+    tokens = sorted(scores.items(), key=lambda item: -item[1])
+    matches = Q()
+    for token, _ in tokens:
+        matches |= Q(term__startswith=token)
+
+    keyword_score = Case(*[When(term__startswith=token, then=Value(score)) for token, score in tokens],
+                         default=Value(0), output_field=FloatField())
+
+    ranked = (
+        SearchTerm.objects
+                  .filter(matches, entity=_entity(model))
+                  .values('object_id')
+                  .annotate(rank=Sum(F('weight') * keyword_score, output_field=FloatField()))
+                  .order_by('-rank', 'object_id')
+                  .values_list('object_id', flat=True)
+    )
+
+    return list(ranked[offset:offset + limit])
+
+
+def _keyword_tokens(keyword):
+    """
+    tokens of a keyword worth matching on their own, e.g. not "the" of an article title
+    """
+    return [token for token in tokenize(keyword)
+            if len(token) >= MIN_KEYWORD_TOKEN_LENGTH and token not in STOP_WORDS]
+
+
+def _matching(tokens):
+    matches = Q()
+    for token in tokens:
+        matches |= Q(term__startswith=token)
+    return matches
+
+
+def _ranked(terms, tokens, limit):
+    """
+    pks of the best `limit` objects of the terms matching the tokens
+    """
+    if not tokens:
+        return []
+
+    return list(
+        terms.filter(_matching(tokens))
+             .values('object_id')
+             .annotate(rank=Sum('weight'))
+             .order_by('-rank', 'object_id')
+             .values_list('object_id', flat=True)[:limit]
+    )
+
+
+def _ranks_per_token(terms, tokens, limit):
+    """
+    (token index, pk, rank) of the best `limit` objects of each token in one query,
+    a term belongs to the longest token it starts with
+    """
+    bucket = Case(*[When(term__startswith=token, then=Value(i)) for i, token in enumerate(tokens)],
+                  output_field=IntegerField())
+    position = Window(RowNumber(), partition_by=[F('bucket')], order_by=[F('rank').desc(), F('object_id').asc()])
+
+    grouped = terms.filter(_matching(tokens)).annotate(bucket=bucket).values('bucket', 'object_id')
+    ranked = grouped.annotate(rank=Sum('weight')).annotate(position=position).order_by()
+    sql, params = ranked.query.sql_with_params()
+
+    # window functions can not be filtered on in the ORM
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT bucket, object_id, rank FROM ({sql}) ranked WHERE position <= %s', [*params, limit])
+        return cursor.fetchall()
+
+
+def search_each(model, keywords, limit, exclude=None):
+    """
+    keyword -> pks of the objects of a model matching it, the most relevant first, as `search`
+    would rank them for the keyword alone. Objects with pks in `exclude` (e.g. a values queryset)
+    are left out. Short tokens and stop words of the keywords are not matched.
+
+    Databases with window functions match all keywords in one query. Weights are summed and
+    limited in the database per token, so a keyword of several tokens is ranked among the best
+    `limit` objects of each of its tokens. Other databases (e.g. SQLite before 3.25) rank each
+    keyword in a query of its own.
+    """
+    terms = SearchTerm.objects.filter(entity=_entity(model))
+    if exclude is not None:
+        terms = terms.exclude(object_id__in=exclude)
+
+    if not connection.features.supports_over_clause:
+        return {keyword: _ranked(terms, _keyword_tokens(keyword), limit) for keyword in keywords}
+
+    tokens = sorted({token for keyword in keywords for token in _keyword_tokens(keyword)},
+                    key=lambda token: (-len(token), token))
+    if not tokens:
+        return {keyword: [] for keyword in keywords}
+
+    # a token counts for the keywords having it or a token it starts with
+    buckets_of = {}
+    for keyword in keywords:
+        own = _keyword_tokens(keyword)
+        buckets_of[keyword] = {i for i, token in enumerate(tokens) if any(token.startswith(t) for t in own)}
+
+    ranks = {keyword: {} for keyword in keywords}
+    for i, pk, rank in _ranks_per_token(terms, tokens, limit):
+        for keyword in keywords:
+            if i in buckets_of[keyword]:
+                ranks[keyword][pk] = ranks[keyword].get(pk, 0) + rank
+
+    return {
+        keyword: sorted(rank, key=lambda pk: (-rank[pk], pk))[:limit]
+        for keyword, rank in ranks.items()
+    }
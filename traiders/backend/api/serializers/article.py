@@ -1,3 +1,4 @@
+from django.db.models import F, Prefetch
 from rest_framework import serializers
 
 from ..models import Article, Like
@@ -10,20 +11,41 @@ class ArticleSerializer(serializers.HyperlinkedModelSerializer):
     num_likes = serializers.SerializerMethodField()
     like = serializers.SerializerMethodField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        """
+        Read the authors and likes of the user along with the articles
+        """
+        queryset = queryset.select_related('author')
+
+        if user.is_authenticated:
+            queryset = queryset.prefetch_related(Prefetch('like_set', queryset=Like.objects.filter(user=user),
+                                                          to_attr='user_likes'))
+
+        return queryset
+
     def get_num_likes(self, article):
-        return Like.objects.filter(article=article).count()
+        return article.like_count
 
     def get_like(self, article):
         user = self.context['request'].user
         if user.is_anonymous:
             return None
 
-        like = Like.objects.filter(user=user, article=article)
-
-        if like.exists():
-            return LikeSerializer(like.first(), context=self.context).data
+        if hasattr(article, 'user_likes'):
+            likes = article.user_likes
         else:
-            return None
+            likes = Like.objects.filter(user=user, article=article)[:1]
+
+        for like in likes:
+            return LikeSerializer(like, context=self.context).data
+        return None
+
+    def update(self, instance, validated_data):
+        instance.like_count = F('like_count')  # not to overwrite likes made meanwhile
+        instance = super().update(instance, validated_data)
+        instance.refresh_from_db(fields=['like_count'])
+        return instance
 
     def validate(self, attrs):
         attrs['author'] = self.context['request'].user
@@ -1,14 +1,20 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from rest_framework import serializers, fields
 from rest_framework.exceptions import PermissionDenied
 
-from ..models import ArticleComment, EquipmentComment, Equipment
+from ..models import ArticleComment, EquipmentComment
 from . import UserSerializer
+from ..equipment_registry import equipments
 
 
 class IsLiked(serializers.BooleanField):
     def get_attribute(self, instance):
         if self.context['request'].user.is_anonymous:
             return False
+        if hasattr(instance, 'viewer_liked'):  # annotated by the views
+            return instance.viewer_liked
         return instance.liked_by.filter(pk=self.context['request'].user.pk).exists()
 
 
@@ -18,7 +24,7 @@ class CommentSerializerBase(serializers.HyperlinkedModelSerializer):
     num_likes = serializers.SerializerMethodField(read_only=True)
 
     def get_num_likes(self, comment):
-        return comment.liked_by.count()
+        return comment.like_count
 
     def validate(self, data):
         # If only liking, user does not have to provide any content or image
@@ -35,9 +41,11 @@ class CommentSerializerBase(serializers.HyperlinkedModelSerializer):
 
         return super().create(validated_data)
 
+    @transaction.atomic
     def update(self, instance, validated_data: dict):
         is_liked = validated_data.pop('is_liked', None)
-        likers = instance.liked_by.all()
+        user = self.context['request'].user
+        likes = user.is_authenticated and instance.liked_by.filter(pk=user.pk).exists()
 
         if validated_data and self.context['request'].user != instance.user:
             raise PermissionDenied
@@ -46,21 +54,31 @@ class CommentSerializerBase(serializers.HyperlinkedModelSerializer):
             if self.context['request'].user.is_anonymous:
                 raise serializers.ValidationError('A guest user cannot like a comment. '
                                                   'Please login to perform this action.')
-            if self.context['request'].user in likers:
+            if likes:
                 raise serializers.ValidationError('You already like this comment.')
             instance.liked_by.add(self.context['request'].user)
         elif is_liked is False:
             if self.context['request'].user.is_anonymous:
                 raise serializers.ValidationError('A guest user cannot unlike a comment '
                                                   'Please login to perform this action.')
-            if self.context['request'].user not in likers:
+            if not likes:
                 raise serializers.ValidationError('You already do not like this comment.')
             instance.liked_by.remove(self.context['request'].user)
 
-        return super().update(instance, validated_data)
+        if is_liked is not None:
+            instance.viewer_liked = is_liked
+
+        # saved relative to the stored count, so likes made meanwhile are not overwritten
+        instance.like_count = Greatest(F('like_count') + {True: 1, False: -1}.get(is_liked, 0), 0)
+        instance = super().update(instance, validated_data)
+        instance.refresh_from_db(fields=['like_count'])
+
+        return instance
 
 
 class ArticleCommentSerializer(CommentSerializerBase):
+    liked_by = serializers.HyperlinkedIdentityField(view_name='articlecomment-likers')
+
     def get_fields(self):
         fields = super().get_fields()
 
@@ -86,12 +104,13 @@ class EquipmentCommentSerializer(CommentSerializerBase):
 
         def run_validation(self, symbol=fields.empty):
             super().run_validation(symbol)
-            equipment = Equipment.objects.filter(symbol=symbol).first()
+            equipment = equipments.get(symbol)
             if equipment is None:
                 raise serializers.ValidationError('No such equipment')
             return equipment
 
     equipment = EquipmentField()
+    liked_by = serializers.HyperlinkedIdentityField(view_name='equipmentcomment-likers')
 
     def get_fields(self):
         fields = super().get_fields()
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from ..models import Equipment
+from .memo import NestedMemoMixin
 
 
-class EquipmentSerializer(serializers.HyperlinkedModelSerializer):
+class EquipmentSerializer(NestedMemoMixin, serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Equipment
         fields = ["url", "id", "name", "category", "symbol"]
@@ -1,7 +1,9 @@
 from rest_framework import serializers
-from ..models import ManualInvestment, Equipment, Asset, OnlineInvestment, Parity
+from ..models import ManualInvestment, Equipment, Asset, OnlineInvestment, LatestParity
 from ..serializers import *
 from rest_framework.exceptions import ValidationError, PermissionDenied
+from ..equipment_registry import equipments
+from ..conversion import graph
 
 
 class BaseInvestmentSerializer(serializers.HyperlinkedModelSerializer):
@@ -10,7 +12,7 @@ class BaseInvestmentSerializer(serializers.HyperlinkedModelSerializer):
     user = UserSerializer(read_only=True)
 
     def _get_equipment_or_raise(self, symbol):
-        eq = Equipment.objects.filter(symbol=symbol).first()
+        eq = equipments.get(symbol)
         if not eq:
             raise serializers.ValidationError('Equipment not found')
         return eq
@@ -97,13 +99,15 @@ class OnlineInvestmentSerializer(BaseInvestmentSerializer):
                 raise ValidationError("You don't have enough balance to perform this action."
                                       "Either provide a credit card or inject assets.")
 
-        latest = Parity.objects.order_by('-date').filter(base_equipment=base_eq,
-                                                         target_equipment=target_eq).first()
+        latest = LatestParity.get_parity(base_eq, target_eq)
 
-        if latest is None:
+        # converted through other pairs if the pair is not quoted
+        rate = latest.close if latest is not None else graph.rate(base_eq.pk, target_eq.pk)
+
+        if rate is None:
             raise ValidationError("This conversion does not exist.")
 
-        target_amount = latest.close * base_amount
+        target_amount = rate * base_amount
         validated_data["target_amount"] = target_amount
         return super().create(validated_data)
 
@@ -128,7 +132,7 @@ class AssetSerializer(serializers.HyperlinkedModelSerializer):
                                                       read_only=True)
 
     def _get_equipment_or_raise(self, symbol):
-        eq = Equipment.objects.filter(symbol=symbol).first()
+        eq = equipments.get(symbol)
         if not eq:
             raise serializers.ValidationError('Equipment not found')
         return eq
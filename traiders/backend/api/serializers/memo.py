@@ -0,0 +1,19 @@
+class NestedMemoMixin:
+    """
+    Renders each instance once per serialization when nested in another serializer,
+    e.g. the few equipments of a page of parities. Renderings are kept in the context by
+    (serializer class, pk), so they are shared by the nested serializers of the same root.
+    """
+
+    def to_representation(self, instance):
+        # field_name is None at the root and '' for the children of a many=True serializer
+        if not self.field_name or getattr(instance, 'pk', None) is None:
+            return super().to_representation(instance)
+
+        memo = self.context.setdefault('nested_representations', {})
+        key = (type(self), instance.pk)
+
+        if key not in memo:
+            memo[key] = super().to_representation(instance)
+
+        return memo[key]
@@ -1,7 +1,8 @@
 from rest_framework import serializers
-from ..models import Equipment, BuyOrder, StopLossOrder, Asset, Parity
+from ..models import Equipment, BuyOrder, StopLossOrder, Asset, LatestParity
 from ..serializers import *
 from rest_framework.exceptions import ValidationError, PermissionDenied
+from ..equipment_registry import equipments
 
 
 class OrderSerializerBase(serializers.HyperlinkedModelSerializer):
@@ -10,7 +11,7 @@ class OrderSerializerBase(serializers.HyperlinkedModelSerializer):
     user = UserSerializer(read_only=True)
 
     def _get_equipment_or_raise(self, symbol):
-        eq = Equipment.objects.filter(symbol=symbol).first()
+        eq = equipments.get(symbol)
         if not eq:
             raise serializers.ValidationError('Equipment not found')
         return eq
@@ -41,8 +42,7 @@ class StopLossOrderSerializer(OrderSerializerBase):
         if not user.email_verified:
             raise PermissionDenied("Please verify your e-mail account before placing Stop/Loss orders.")
 
-        latest = Parity.objects.order_by('-date').filter(base_equipment=base_eq,
-                                                         target_equipment=target_eq).first()
+        latest = LatestParity.get_parity(base_eq, target_eq)
 
         if latest is None:
             raise ValidationError("This conversion does not exist.")
@@ -87,8 +87,7 @@ class BuyOrderSerializer(OrderSerializerBase):
         if not user.email_verified:
             raise PermissionDenied("Please verify your e-mail account before placing buying orders.")
 
-        latest = Parity.objects.order_by('-date').filter(base_equipment=base_eq,
-                                                         target_equipment=target_eq).first()
+        latest = LatestParity.get_parity(base_eq, target_eq)
 
         if latest is None:
             raise ValidationError("This conversion does not exist.")
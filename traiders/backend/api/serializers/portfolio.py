@@ -1,6 +1,7 @@
 from rest_framework import serializers, exceptions
-from ..models import Portfolio, PortfolioItem, Equipment
+from ..models import Portfolio, PortfolioItem
 from ..serializers import UserSerializer
+from ..equipment_registry import equipments
 
 
 class IsFollowingField(serializers.BooleanField):
@@ -17,7 +18,7 @@ class PortfolioItemSerializer(serializers.HyperlinkedModelSerializer):
             raise exceptions.PermissionDenied("Cant add items to others' portfolios")
 
         def _find_equipment(data):
-            return Equipment.objects.filter(**data).first()
+            return equipments.get(data['symbol'])
 
         for key in ['base_equipment', 'target_equipment']:
             validated_data[key] = _find_equipment(validated_data[key])
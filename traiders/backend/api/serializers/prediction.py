@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from ..models import Prediction, Equipment
+from ..models import Prediction
+from ..equipment_registry import equipments
 
 
 class PredictionSerializer(serializers.HyperlinkedModelSerializer):
@@ -7,7 +8,7 @@ class PredictionSerializer(serializers.HyperlinkedModelSerializer):
     target_equipment = serializers.CharField()
 
     def _get_equipment_or_raise(self, symbol):
-        eq = Equipment.objects.filter(symbol=symbol).first()
+        eq = equipments.get(symbol)
         if not eq:
             raise serializers.ValidationError('Equipment not found')
         return eq
@@ -7,6 +7,7 @@ from rest_framework import serializers
 
 from ..models import User
 from .users import UserSerializer
+from ..outbound import interactive_client
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +50,11 @@ class TokenSerializer(serializers.Serializer):
             'code': auth_code,
         }
 
-        response = rq.post('https://www.googleapis.com/oauth2/v4/token', json=data)
+        try:
+            response = interactive_client.post('https://www.googleapis.com/oauth2/v4/token', json=data)
+        except rq.RequestException:
+            logger.exception('Failed to reach google for access_token')
+            raise serializers.ValidationError('Could not get access_token')
 
         try:
             return response.json()['access_token']
@@ -64,7 +69,11 @@ class TokenSerializer(serializers.Serializer):
             'access_token': access_token
         }
 
-        response = rq.get('https://www.googleapis.com/userinfo/v2/me', params=params)
+        try:
+            response = interactive_client.get('https://www.googleapis.com/userinfo/v2/me', params=params)
+        except rq.RequestException:
+            logger.exception('Failed to reach google for user info')
+            raise serializers.ValidationError('Could not get user info')
 
         try:
             data = response.json()
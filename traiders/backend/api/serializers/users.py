@@ -10,11 +10,13 @@ from django.template.loader import render_to_string
 from django.urls import reverse
 
 from ..utils import EmailVerificationTokenGenerator
+from ..outbound import interactive_client
+from .memo import NestedMemoMixin
 
 options = Countries()
 
 
-class UserSerializer(serializers.HyperlinkedModelSerializer):
+class UserSerializer(NestedMemoMixin, serializers.HyperlinkedModelSerializer):
     country = CountryField(country_dict=True)
 
     def validate_country(self, code_or_name):
@@ -33,7 +35,10 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
 
     @staticmethod
     def validate_iban(iban):
-        res = rq.get(f'https://openiban.com/validate/{iban}')
+        try:
+            res = interactive_client.get(f'https://openiban.com/validate/{iban}')
+        except rq.RequestException:
+            raise serializers.ValidationError('IBAN could not be validated, please try again later')
 
         if res.status_code != 200 or not res.json().get('valid'):
             raise serializers.ValidationError('Enter a valid IBAN')
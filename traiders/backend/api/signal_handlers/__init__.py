@@ -3,3 +3,6 @@ from . import parity_signal_handlers
 from . import investment_signals
 from . import order_signals
 from . import notification_signals
+from . import cache_signals
+from . import search_signals
+from . import recommendation_signals
@@ -0,0 +1,58 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch.dispatcher import receiver
+from django.utils import timezone
+
+from ..models import Parity, LatestParity, ParitySetting, Equipment, Asset, ManualInvestment, OnlineInvestment
+from .. import response_cache
+from ..equipment_registry import equipments
+from ..conversion import graph
+
+
+@receiver(post_save, sender=Parity)
+@receiver(post_delete, sender=Parity)
+@receiver(post_save, sender=ParitySetting)
+@receiver(post_delete, sender=ParitySetting)
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+def invalidate_latest_parities(sender, **kwargs):
+    response_cache.latest_parities.invalidate()
+
+
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+def invalidate_equipment_registry(sender, **kwargs):
+    equipments.invalidate()
+
+
+@receiver(post_save, sender=Parity)
+@receiver(post_save, sender=LatestParity)
+@receiver(post_delete, sender=LatestParity)
+def update_conversion_graph(sender, instance, **kwargs):
+    # a new parity of a pair changes its rate, new or removed latest parities change the paths
+    graph.pair_changed(instance.base_equipment_id, instance.target_equipment_id,
+                       added_or_removed=sender is LatestParity and kwargs.get('created', True))
+
+
+@receiver(post_save, sender=Parity)
+@receiver(post_delete, sender=Parity)
+def invalidate_valuations(sender, instance, **kwargs):
+    # past days of valuations are cached, today's are at the latest rates
+    if timezone.localtime(instance.date).date() < timezone.localdate():
+        response_cache.valuations.invalidate()
+
+
+@receiver(post_save, sender=LatestParity)
+@receiver(post_delete, sender=LatestParity)
+def invalidate_valuations_of_pairs(sender, **kwargs):
+    if kwargs.get('created', True):  # a new or removed pair changes the conversion paths
+        response_cache.valuations.invalidate()
+
+
+@receiver(post_save, sender=Asset)
+@receiver(post_delete, sender=Asset)
+@receiver(post_save, sender=ManualInvestment)
+@receiver(post_delete, sender=ManualInvestment)
+@receiver(post_save, sender=OnlineInvestment)
+@receiver(post_delete, sender=OnlineInvestment)
+def invalidate_user_valuations(sender, instance, **kwargs):
+    response_cache.valuations.invalidate(instance.user_id)
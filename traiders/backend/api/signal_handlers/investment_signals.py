@@ -9,8 +9,15 @@ logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=OnlineInvestment)
-@transaction.atomic
 def online_investment_post(sender, instance: OnlineInvestment, **kwargs):
+    if getattr(instance, 'assets_settled', False):  # created by settle_orders, assets are already updated
+        return
+
+    _update_assets(instance)
+
+
+@transaction.atomic
+def _update_assets(instance: OnlineInvestment):
     user = instance.user
     base_eq = instance.base_equipment
     target_eq = instance.target_equipment
@@ -3,7 +3,7 @@ from django.dispatch.dispatcher import receiver
 from django.urls import reverse
 from django.db.models.signals import post_save, pre_save
 from django.db import transaction
-from ..models import Article, Alert, Following, Parity, Event, Notification, Equipment
+from ..models import Article, Alert, Following, Parity, LatestParity, Event, Notification, Equipment
 
 logger = logging.getLogger(__name__)
 
@@ -55,10 +55,7 @@ def parity_change(sender, instance: Parity, created, **kwargs):
     t2 = Alert.objects.filter(base_symbol=base_symbol, target_symbol=target_symbol, ratio__lte=ratio,
                               increasing=True)
 
-    parity = (
-        Parity.objects.order_by('-date').filter(target_equipment__symbol=target_symbol,
-                                                base_equipment__symbol=base_symbol).first()
-    )
+    parity = LatestParity.get_parity(instance.base_equipment, instance.target_equipment)
 
     parity_url = reverse('parity-detail', kwargs={'pk': parity.pk})
 
@@ -1,16 +1,128 @@
 import decimal
 import logging
 
-from django.db import transaction
-from django.db.models.signals import post_save
+from django.db import transaction, connection
+from django.db.models.signals import post_save, post_delete
 from django.dispatch.dispatcher import receiver
 from django.urls import reverse
 
 from ..models import BuyOrder, Parity, StopLossOrder, Asset, OnlineInvestment, Notification
+from .. import orderbook
+from .. import recommendations
+from .. import response_cache
 
 logger = logging.getLogger(__name__)
 
 
+@receiver(post_save, sender=BuyOrder)
+def buy_order_saved(sender, instance: BuyOrder, **kwargs):
+    orderbook.buy_orders.add(instance)
+
+
+@receiver(post_delete, sender=BuyOrder)
+def buy_order_deleted(sender, instance: BuyOrder, **kwargs):
+    orderbook.buy_orders.remove(instance)
+
+
+@receiver(post_save, sender=StopLossOrder)
+def stoploss_order_saved(sender, instance: StopLossOrder, **kwargs):
+    orderbook.stoploss_orders.add(instance)
+
+
+@receiver(post_delete, sender=StopLossOrder)
+def stoploss_order_deleted(sender, instance: StopLossOrder, **kwargs):
+    orderbook.stoploss_orders.remove(instance)
+
+
+def _create_investments(investments):
+    """
+    Insert the investments of settled orders with their pks, which the notifications link to.
+    Assets are already updated by the settlement, so the asset handler skips these investments.
+    """
+    for investment in investments:
+        investment.assets_settled = True
+
+    if connection.features.can_return_ids_from_bulk_insert:
+        OnlineInvestment.objects.bulk_create(investments)
+    else:
+        # the database cannot return ids from bulk inserts (SQLite)
+        for investment in investments:
+            investment.save(force_insert=True)
+
+
+@transaction.atomic
+def settle_orders(base_eq, target_eq, ratio, buy_orders, stoploss_orders):
+    """
+    Settle the crossed orders of a parity with a constant number of queries.
+
+    Holds are released from the base assets, bought amounts are added to the target assets,
+    and an investment and a notification are created for every order.
+    """
+    settlements = []  # (order, amount, reference_obj, message)
+
+    for order in buy_orders:
+        settlements.append((order, order.buy_amount, "BuyOrder",
+                            "Your buy order in case the parity " + base_eq.symbol + "/" + target_eq.symbol + " becomes lower than " + str(ratio) + " has been processed."))
+
+    for order in stoploss_orders:
+        settlements.append((order, order.sell_amount, "StopLossOrder",
+                            "Your stop-loss order for " + target_eq.symbol + "/" + base_eq.symbol + " has been processed."))
+
+    if not settlements:
+        return
+
+    user_ids = {order.user_id for order, *_ in settlements}
+    assets = {
+        (asset.user_id, asset.equipment_id): asset
+        for asset in Asset.objects.select_for_update().filter(user_id__in=user_ids,
+                                                              equipment__in=[base_eq, target_eq])
+    }
+    new_assets = {}
+
+    def get_asset(user_id, equipment):
+        key = (user_id, equipment.pk)
+        if key not in assets:
+            assets[key] = new_assets[key] = Asset(user_id=user_id, equipment=equipment)
+        return assets[key]
+
+    investments = []
+    for order, amount, *_ in settlements:
+        target_amount = ratio * amount
+
+        base_asset = get_asset(order.user_id, base_eq)
+        base_asset.on_hold_for_investment = base_asset.serializable_value('on_hold_for_investment') - amount
+
+        target_asset = get_asset(order.user_id, target_eq)
+        target_asset.amount = target_asset.serializable_value('amount') + target_amount
+
+        investments.append(OnlineInvestment(base_equipment=base_eq,
+                                            target_equipment=target_eq,
+                                            user_id=order.user_id,
+                                            base_amount=amount,
+                                            target_amount=target_amount))
+
+    Asset.objects.bulk_update([asset for key, asset in assets.items() if key not in new_assets],
+                              ['amount', 'on_hold_for_investment'])
+    Asset.objects.bulk_create(new_assets.values())
+
+    # assets are updated above instead of by the post_save handler of investments
+    _create_investments(investments)
+    recommendations.mark_dirty(user_ids)
+    for user_id in user_ids:
+        response_cache.valuations.invalidate(user_id)
+
+    Notification.objects.bulk_create([
+        Notification(user_id=order.user_id,
+                     message=message,
+                     reference_obj=reference_obj,
+                     reference_url=reverse('onlineinvestment-detail', kwargs={'pk': investment.pk}))
+        for (order, amount, reference_obj, message), investment in zip(settlements, investments)
+    ])
+
+    BuyOrder.objects.filter(pk__in=[order.pk for order in buy_orders]).delete()
+    StopLossOrder.objects.filter(pk__in=[order.pk for order in stoploss_orders]).delete()
+
+
 @receiver(post_save, sender=Parity)
 @transaction.atomic
 def handle_orders(sender, instance: Parity, created, **kwargs):
@@ -20,62 +132,23 @@ def handle_orders(sender, instance: Parity, created, **kwargs):
     target_eq = instance.target_equipment
     ratio = decimal.Decimal(instance.close)
 
-    buy_orders = BuyOrder.objects.filter(base_equipment=base_eq,
-                                         target_equipment=target_eq,
-                                         buy_ratio__gt=ratio)
-
-    stoploss_orders = StopLossOrder.objects.filter(base_equipment=base_eq,
-                                                   target_equipment=target_eq,
-                                                   sell_ratio__lt=ratio)
-
-    for order in buy_orders:
-        user = order.user
-        buy_amount = order.buy_amount
-        target_amount = ratio * buy_amount
-
-        base_asset = Asset.objects.get(user=user,
-                                       equipment=base_eq)
-
-        base_asset.amount = base_asset.serializable_value('amount') + buy_amount
-        base_asset.on_hold_for_investment = base_asset.serializable_value('on_hold_for_investment') - buy_amount
-        base_asset.save()
-        investment = OnlineInvestment.objects.create(base_equipment=base_eq,
-                                                     user=user,
-                                                     target_equipment=target_eq,
-                                                     base_amount=buy_amount,
-                                                     target_amount=target_amount)
-        pk = investment.pk
-        url = reverse('onlineinvestment-detail', kwargs={'pk': pk})
-        Notification.objects.create(user=user,
-                                    message="Your buy order in case the parity " + base_eq.symbol + "/" + target_eq.symbol + " becomes lower than " + str(
-                                        ratio) + " has been processed.",
-                                    reference_obj="BuyOrder",
-                                    reference_url=url)
-
-        order.delete()
-
-    for order in stoploss_orders:
-        user = order.user
-        sell_amount = order.sell_amount
-        target_amount = ratio * sell_amount
-
-        base_asset = Asset.objects.get(user=user,
-                                       equipment=base_eq)
-
-        base_asset.amount = base_asset.serializable_value('amount') + sell_amount
-        base_asset.on_hold_for_investment = base_asset.serializable_value('on_hold_for_investment') - sell_amount
-
-        base_asset.save()
-
-        investment = OnlineInvestment.objects.create(base_equipment=base_eq,
-                                                     target_equipment=target_eq,
-                                                     user=user,
-                                                     base_amount=sell_amount,
-                                                     target_amount=target_amount)
-        pk = investment.pk
-        url = reverse('onlineinvestment-detail', kwargs={'pk': pk})
-        Notification.objects.create(user=user,
-                                    message="Your stop-loss order for " + target_eq.symbol + "/" + base_eq.symbol + " has been processed.",
-                                    reference_obj="StopLossOrder",
-                                    reference_url=url)
-        order.delete()
+    # find the crossed orders in the books, then read them all at once.
+    # ratios are checked again since the books may contain orders deleted by other processes.
+    buy_order_pks = orderbook.buy_orders.above(base_eq.pk, target_eq.pk, ratio)
+    stoploss_order_pks = orderbook.stoploss_orders.below(base_eq.pk, target_eq.pk, ratio)
+
+    buy_orders = []
+    if buy_order_pks:
+        buy_orders = list(BuyOrder.objects.select_for_update().filter(pk__in=buy_order_pks,
+                                                                      base_equipment=base_eq,
+                                                                      target_equipment=target_eq,
+                                                                      buy_ratio__gt=ratio))
+
+    stoploss_orders = []
+    if stoploss_order_pks:
+        stoploss_orders = list(StopLossOrder.objects.select_for_update().filter(pk__in=stoploss_order_pks,
+                                                                                base_equipment=base_eq,
+                                                                                target_equipment=target_eq,
+                                                                                sell_ratio__lt=ratio))
+
+    settle_orders(base_eq, target_eq, ratio, buy_orders, stoploss_orders)
@@ -4,8 +4,7 @@ from django.db.models.signals import post_save, post_delete, pre_save
 from django.db import transaction
 from django.utils.timezone import datetime, make_aware
 
-from ..models import ParitySetting, Parity
-from .. import alphavantage as av
+from ..models import ParitySetting, Parity, LatestParity, BackfillJob
 
 logger = logging.getLogger(__name__)
 
@@ -24,46 +23,16 @@ def delete_parity_history(sender, instance: ParitySetting, **kwargs):
 
 
 @receiver(post_save, sender=ParitySetting)
-@transaction.atomic
-def create_parity_history(sender, instance: ParitySetting, created, **kwargs):
-    # handle only creation
-    if not created:
-        return
-
-    logger.info(f'creating history for: {instance}')
-
-    base_eq = instance.base_equipment
-    target_eq = instance.target_equipment
-
-    try:
-        last_updated, parities = av.fetch_parities(base_eq.symbol, base_eq.category,
-                                                   target_eq.symbol, target_eq.category,
-                                                   outputsize='full')
-    except Exception as e:
-        logger.error(f'fetching history for {base_eq}/{target_eq} failed: {e}', exc_info=True)
-        instance.delete()
-        return
-
-    for parity in parities:
-        # ignore older than from_date
-        if parity['date'] < instance.from_date:
-            continue
-
-        Parity.objects.create(base_equipment=base_eq, target_equipment=target_eq, **parity)
-
-    instance.last_updated = last_updated
-    instance.save()
+def create_backfill_job(sender, instance: ParitySetting, created, **kwargs):
+    # the history is fetched by the `runbackfills` worker, not while saving
+    if created:
+        BackfillJob.objects.create(parity_setting=instance)
 
 
 @receiver(pre_save, sender=Parity)
 @transaction.atomic
 def end_of_day_parity_clean(sender, instance: Parity, **kwargs):
-    last_parity = (
-        Parity.objects
-              .order_by('-date')
-              .filter(base_equipment=instance.base_equipment, target_equipment=instance.target_equipment)
-              .first()
-    )
+    last_parity = LatestParity.get_parity(instance.base_equipment, instance.target_equipment)
 
     if not last_parity:
         return
@@ -85,3 +54,30 @@ def end_of_day_parity_clean(sender, instance: Parity, **kwargs):
         # remove time data from date
         last_parity.date = make_aware(datetime(last_day.year, last_day.month, last_day.day))
         last_parity.save()
+
+
+@receiver(post_save, sender=Parity)
+def update_latest_parity(sender, instance: Parity, **kwargs):
+    latest = (
+        LatestParity.objects
+                    .select_related('parity')
+                    .filter(base_equipment=instance.base_equipment, target_equipment=instance.target_equipment)
+                    .first()
+    )
+
+    if latest is None:
+        LatestParity.objects.create(base_equipment=instance.base_equipment,
+                                    target_equipment=instance.target_equipment,
+                                    parity=instance)
+    elif latest.parity_id != instance.pk and latest.parity.date <= instance.date:
+        latest.parity = instance
+        latest.save()
+
+
+@receiver(post_delete, sender=LatestParity)
+def replace_latest_parity(sender, instance: LatestParity, **kwargs):
+    # the latest parity is deleted, the previous one becomes the latest.
+    # other parities of the pair may be getting deleted with it, so wait for the commit.
+    base_id = instance.base_equipment_id
+    target_id = instance.target_equipment_id
+    transaction.on_commit(lambda: LatestParity.refresh(base_id, target_id))
@@ -3,7 +3,7 @@ from django.dispatch.dispatcher import receiver
 from django.db.models.signals import pre_save
 from django.db import transaction
 import datetime
-from ..models import Parity, Prediction
+from ..models import Parity, LatestParity, Prediction
 
 _DAY_CLOSING = datetime.time(hour=18, minute=30)
 logger = logging.getLogger(__name__)
@@ -22,8 +22,7 @@ def prediction_results(sender, instance: Parity, **kwargs):
                                                         minute=_DAY_CLOSING.minute,
                                                         tzinfo=datetime.timezone.utc)
 
-    previous_latest = Parity.objects.order_by('-date').filter(base_equipment=base_eq,
-                                                              target_equipment=target_eq).first()
+    previous_latest = LatestParity.get_parity(base_eq, target_eq)
 
     if previous_latest is None:
         # No parities
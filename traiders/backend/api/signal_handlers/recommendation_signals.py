@@ -0,0 +1,50 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch.dispatcher import receiver
+
+from ..models import Prediction, PortfolioItem, Portfolio, OnlineInvestment, ManualInvestment, Article, Event, \
+    Following
+from .. import recommendations
+
+
+@receiver(post_save, sender=Prediction)
+@receiver(post_delete, sender=Prediction)
+@receiver(post_save, sender=OnlineInvestment)
+@receiver(post_delete, sender=OnlineInvestment)
+@receiver(post_save, sender=ManualInvestment)
+@receiver(post_delete, sender=ManualInvestment)
+def user_interests_changed(sender, instance, **kwargs):
+    if getattr(instance, 'assets_settled', False):  # settle_orders marks the feeds of its users at once
+        return
+
+    recommendations.mark_dirty([instance.user_id])
+
+
+@receiver(post_save, sender=PortfolioItem)
+@receiver(post_delete, sender=PortfolioItem)
+def portfolio_item_changed(sender, instance: PortfolioItem, **kwargs):
+    recommendations.mark_dirty(Portfolio.objects.filter(pk=instance.portfolio_id).values('user'))
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_changed(sender, instance: Article, **kwargs):
+    recommendations.mark_dirty([instance.author_id])
+
+
+@receiver(post_save, sender=Following)
+@receiver(post_delete, sender=Following)
+def following_changed(sender, instance: Following, **kwargs):
+    recommendations.mark_dirty([instance.user_following_id])
+
+
+@receiver(m2m_changed, sender=Event.followed_by.through)
+def event_followers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if reverse:  # events of a user
+        recommendations.mark_dirty([instance.pk])
+    elif action == 'pre_clear':
+        recommendations.mark_dirty(list(instance.followed_by.values_list('pk', flat=True)))
+    else:
+        recommendations.mark_dirty(pk_set)
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch.dispatcher import receiver
+
+from ..models import Article, Event, Equipment, User
+from .. import search_index
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Equipment)
+def index_search_terms(sender, instance, **kwargs):
+    search_index.index_object(instance)
+
+
+@receiver(pre_save, sender=User)
+def find_indexed_changes(sender, instance: User, update_fields=None, **kwargs):
+    """
+    Notes the indexed fields changed by the save, users are saved on every login
+    """
+    fields = search_index.indexed_fields(User)
+
+    if update_fields is not None and not fields.intersection(update_fields):
+        instance.indexed_changes = set()
+        return
+
+    previous = User.objects.filter(pk=instance.pk).values(*fields).first() if instance.pk else None
+    if previous is None:
+        instance.indexed_changes = fields
+    else:
+        instance.indexed_changes = {field for field in fields if previous[field] != getattr(instance, field)}
+
+
+@receiver(post_save, sender=User)
+def index_user_search_terms(sender, instance: User, created, **kwargs):
+    changes = getattr(instance, 'indexed_changes', search_index.indexed_fields(User))
+    if not created and not changes:
+        return
+
+    search_index.index_object(instance)
+
+    # articles are indexed with the username of their authors
+    if not created and 'username' in changes:
+        search_index.index_objects(Article, list(Article.objects.filter(author=instance).select_related('author')))
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Equipment)
+@receiver(post_delete, sender=User)
+def remove_search_terms(sender, instance, **kwargs):
+    search_index.remove_object(instance)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests as rq
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .outbound import client
+
+logger = logging.getLogger(__name__)
+
+WORD_LIST_PATH = os.path.join(os.path.dirname(__file__), 'data', 'related_words.txt')
+MAX_RELATED = 50  # per word in the index
+
+DATAMUSE_URL = 'https://api.datamuse.com/words'
+DATAMUSE_TTL = 24 * 60 * 60
+
+_index = None
+_index_lock = threading.Lock()
+_refresh_executor = ThreadPoolExecutor(max_workers=2)
+
+
+def build_index(lines):
+    """
+    Index of a word list, {word: [[score, related word], ...]} ordered by score.
+    Words are scored by their position in their groups, and higher in the groups they lead.
+    """
+    scores = {}
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        group = [word.strip().lower() for word in line.split(',') if word.strip()]
+
+        for i, word in enumerate(group):
+            weight = 1 if i == 0 else 0.5
+            related = scores.setdefault(word, {})
+
+            for j, other in enumerate(group):
+                if other != word:
+                    related[other] = max(related.get(other, 0), weight * (len(group) - j) / len(group))
+
+    def ranked(related):
+        return sorted([[round(score, 4), other] for other, score in related.items()],
+                      key=lambda item: (-item[0], item[1]))[:MAX_RELATED]
+
+    return {word: ranked(related) for word, related in scores.items()}
+
+
+def get_index():
+    """
+    Index built by `buildsynonymindex`, loaded once per process. Built from the bundled word list if missing.
+    """
+    global _index
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    with open(settings.SYNONYM_INDEX_PATH) as f:
+                        _index = json.load(f)
+                except FileNotFoundError:
+                    logger.warning(f'{settings.SYNONYM_INDEX_PATH} is not built, using {WORD_LIST_PATH}')
+                    with open(WORD_LIST_PATH) as f:
+                        _index = build_index(f)
+
+    return _index
+
+
+def _refresh_from_datamuse(phrase, cache_key):
+    try:
+        res = client.get(DATAMUSE_URL, params={'ml': phrase, 'max': MAX_RELATED})
+
+        if res.status_code != 200:
+            logger.warning("Datamuse returned non-200")
+            return
+
+        similars = res.json()
+        related = []
+        if similars:
+            max_score = similars[0]['score']
+            related = [[dct['score'] / max_score, dct['word']] for dct in similars]
+
+        cache.set(cache_key, related, DATAMUSE_TTL)
+    except rq.RequestException as e:
+        logger.warning(f"Datamuse is not reachable: {e}")
+    finally:
+        connections.close_all()  # of this thread, used by the database cache
+
+
+def _datamuse_related(phrase):
+    """
+    Related words of Datamuse cached from earlier requests. Missing ones are fetched in the background.
+    """
+    if not settings.SYNONYM_DATAMUSE_REFRESH:
+        return []
+
+    cache_key = 'datamuse:' + hashlib.md5(phrase.encode()).hexdigest()
+    related = cache.get(cache_key)
+
+    if related is None:
+        if cache.add(cache_key + ':pending', True, 60):  # not requested by another request
+            _refresh_executor.submit(_refresh_from_datamuse, phrase, cache_key)
+        return []
+
+    return related
+
+
+def find_closest(keyword, top_k):
+    """
+    (score, word) pairs, the words of the keyword with score 1 followed by
+    at most `top_k` related words scored relative to the most related one
+    """
+    kws = [(1, word) for word in keyword.split(' ')]
+
+    phrase = keyword.strip().lower()
+    index = get_index()
+    candidates = {}
+
+    for key in [phrase] + phrase.split():
+        for score, word in index.get(key, []):
+            candidates[word] = max(candidates.get(word, 0), score)
+
+    for score, word in _datamuse_related(phrase):
+        candidates[word] = max(candidates.get(word, 0), score)
+
+    for word in [phrase] + phrase.split():  # already searched
+        candidates.pop(word, None)
+
+    similars = sorted(candidates.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+
+    if similars:
+        max_score = similars[0][1]
+        kws.extend((score / max_score, word) for word, score in similars)
+
+    return kws
@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils.timezone import datetime, make_aware
+
+from ..models import Equipment
+from .. import search_index
+from ..equipment_registry import equipments
+from .. import alphavantage as av
+from ..ratelimit import KeyScheduler
+from ..timeseries import parse_time_series
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Responds like AlphaVantage, rejecting the keys in `server.exhausted_keys`
+    """
+
+    def do_GET(self):
+        if self.path.startswith('/physical_currency_list/'):
+            body = self.server.currency_list.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        key = parse_qs(urlparse(self.path).query)['apikey'][0]
+        self.server.requested_keys.append(key)
+
+        if key in self.server.exhausted_keys:
+            data = {'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute.'}
+        else:
+            data = {
+                'Meta Data': {'5. Last Refreshed': '2019-12-20 21:55:00'},
+                'Time Series FX (Daily)': {
+                    '2019-12-20': {'1. open': '1.1', '2. high': '1.2', '3. low': '1.0', '4. close': '1.1'}
+                }
+            }
+
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class KeySchedulerTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_shared_budget(self):
+        # e.g. the server and a cron command
+        first = KeyScheduler('test', ['key1', 'key2'], budgets=[(2, 60)], max_wait=0)
+        second = KeyScheduler('test', ['key1', 'key2'], budgets=[(2, 60)], max_wait=0)
+
+        keys = [first.acquire(), second.acquire(), first.acquire(), second.acquire()]
+        self.assertListEqual(sorted(keys), ['key1', 'key1', 'key2', 'key2'])
+
+        self.assertIsNone(first.acquire())
+        self.assertIsNone(second.acquire())
+        self.assertEqual(second.metrics()['keys'][0]['remaining'], [0])
+
+    def test_shared_exhausted(self):
+        first = KeyScheduler('test', ['key1'], budgets=[(5, 60), (500, 24 * 60 * 60)], max_wait=0)
+        second = KeyScheduler('test', ['key1'], budgets=[(5, 60), (500, 24 * 60 * 60)], max_wait=0)
+
+        first.exhausted('key1')
+        self.assertIsNone(second.acquire())
+        self.assertEqual(second.metrics()['keys'][0]['remaining'], [0, 500])
+
+    def test_separate_names(self):
+        first = KeyScheduler('first', ['key1'], budgets=[(1, 60)], max_wait=0)
+        second = KeyScheduler('second', ['key1'], budgets=[(1, 60)], max_wait=0)
+
+        self.assertEqual(first.acquire(), 'key1')
+        self.assertEqual(second.acquire(), 'key1')
+
+
+class DoRequestTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.requested_keys = []
+        self.server.exhausted_keys = set()
+        self.server.currency_list = ''
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        patch = mock.patch.object(av, 'ALPHA_VANTAGE_BASE_URL', f'http://127.0.0.1:{self.server.server_port}/')
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _use_scheduler(self, keys, budgets, max_wait=5):
+        scheduler = KeyScheduler('test', keys, budgets=budgets, max_wait=max_wait)
+        patch = mock.patch.object(av, 'scheduler', scheduler)
+        patch.start()
+        self.addCleanup(patch.stop)
+        return scheduler
+
+    def _fetch(self):
+        return av.fetch_parities('EUR', 'currency', 'USD', 'currency', outputsize='compact')
+
+    def test_spread_over_keys(self):
+        self._use_scheduler(['key1', 'key2'], budgets=[(2, 60)])
+
+        for _ in range(4):
+            last_updated, parities = self._fetch()
+            self.assertEqual(parities.close[0], '1.1')
+
+        self.assertListEqual(sorted(self.server.requested_keys), ['key1', 'key1', 'key2', 'key2'])
+
+    def test_exhausted_key_is_skipped(self):
+        scheduler = self._use_scheduler(['dead', 'live'], budgets=[(5, 60)])
+        self.server.exhausted_keys.add('dead')
+
+        self._fetch()
+        self._fetch()
+
+        # the rejected key is not tried again until its budget refills
+        self.assertListEqual(self.server.requested_keys, ['dead', 'live', 'live'])
+        self.assertEqual(scheduler.metrics()['keys'][0]['remaining'], [0])
+
+    def test_queued_when_spent(self):
+        scheduler = self._use_scheduler(['key1'], budgets=[(1, 0.2)])
+
+        start = time.monotonic()
+        self._fetch()
+        self._fetch()
+
+        # waits for the budget instead of failing
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertEqual(scheduler.metrics()['requests'], 2)
+        self.assertEqual(scheduler.metrics()['queued'], 1)
+
+    def test_quota_error(self):
+        self._use_scheduler(['key1'], budgets=[(1, 60)], max_wait=0.1)
+
+        self._fetch()
+
+        with self.assertRaises(av.QuotaError):
+            self._fetch()
+
+        self.assertEqual(len(self.server.requested_keys), 1)
+
+    def test_fetch_equipment_data(self):
+        self.server.currency_list = 'currency code,currency name\r\n' \
+                                    'USD,United States Dollar\r\n' \
+                                    'KPW,"Korea, North Won"\r\n'
+
+        self.assertListEqual(list(av.fetch_equipment_data('currency')), [
+            {'symbol': 'USD', 'name': 'United States Dollar', 'category': 'currency'},
+            {'symbol': 'KPW', 'name': 'Korea, North Won', 'category': 'currency'},
+        ])
+
+    def test_no_keys(self):
+        self._use_scheduler([], budgets=[(1, 60)])
+
+        with self.assertRaises(av.NoKeys):
+            self._fetch()
+
+
+class FetchEquipmentsTestCase(TestCase):
+    def setUp(self):
+        Equipment.objects.create(symbol='USD', name='US Dollars', category='currency')
+
+    @staticmethod
+    def _fetch_equipment_data(category):
+        if category == 'currency':
+            yield {'symbol': 'USD', 'name': 'United States Dollar', 'category': 'currency'}
+            yield {'symbol': 'EUR', 'name': 'Euro', 'category': 'currency'}
+        elif category == 'crypto':
+            yield {'symbol': 'BTC', 'name': 'Bitcoin', 'category': 'crypto'}
+            yield {'symbol': 'EUR', 'name': 'Euro Token', 'category': 'crypto'}
+
+    def test_fetch_equipments(self):
+        with mock.patch.object(av, 'fetch_equipment_data', side_effect=self._fetch_equipment_data):
+            # existing symbols are read once, new equipments are created and indexed at once
+            with self.assertNumQueries(9):  # including the savepoints of the command and the index
+                call_command('fetchequipments')
+
+        self.assertDictEqual(dict(Equipment.objects.values_list('symbol', 'name')),
+                             {'USD': 'US Dollars', 'EUR': 'Euro', 'BTC': 'Bitcoin'})
+
+        bitcoin = Equipment.objects.get(symbol='BTC')
+        self.assertListEqual(search_index.search(Equipment, [(1, 'bitcoin')], 10), [bitcoin.pk])
+        self.assertEqual(equipments.get('BTC'), bitcoin)
+
+
+class TimeSeriesTestCase(SimpleTestCase):
+    def test_forex(self):
+        parities = parse_time_series({
+            '2019-12-20': {'1. open': '1.1', '2. high': '1.2', '3. low': '1.0', '4. close': '1.15'},
+            '2019-12-19': {'1. open': '1.0', '2. high': '1.1', '3. low': '0.9', '4. close': '1.1'},
+        }, av.FOREX_KEYS)
+
+        self.assertEqual(len(parities), 2)
+        self.assertListEqual(parities.date, [make_aware(datetime(2019, 12, 20)), make_aware(datetime(2019, 12, 19))])
+        self.assertListEqual(parities.close, ['1.15', '1.1'])
+        self.assertDictEqual(parities.row(1), {'date': make_aware(datetime(2019, 12, 19)),
+                                               'open': '1.0', 'high': '1.1', 'low': '0.9', 'close': '1.1'})
+
+    def test_digital(self):
+        time_series = {
+            '2019-12-20': {'1a. open (USD)': '7150.1', '1b. open (USD)': '7150.1',
+                           '2a. high (USD)': '7200.0', '2b. high (USD)': '7200.0',
+                           '3a. low (USD)': '7100.0', '3b. low (USD)': '7100.0',
+                           '4a. close (USD)': '7190.5', '4b. close (USD)': '7190.5',
+                           '5. volume': '100', '6. market cap (USD)': '719050'},
+        }
+
+        parities = parse_time_series(time_series, av._digital_keys(time_series))
+        self.assertListEqual(parities.close, ['7190.5'])
+
+    def test_invalid(self):
+        with self.assertRaises(Exception):
+            parse_time_series({'2019-12-20': {'1. open': '1.1'}}, av.FOREX_KEYS)
+
+        with self.assertRaises(Exception):
+            parse_time_series({'20 December': {'1. open': '1', '2. high': '1', '3. low': '1', '4. close': '1'}},
+                              av.FOREX_KEYS)
@@ -1,9 +1,12 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 
-from ..models import Article, User
+from ..models import Article, User, Like
 
 
 class ArticleViewSetTests(APITestCase):
@@ -148,3 +151,29 @@ class ArticleViewSetTests(APITestCase):
         for i in range(len(articles) - 1):
             self.assertGreater(articles[i].get('created_at'),
                                articles[i + 1].get('created_at'))
+
+    def test_list_num_queries(self):
+        for i in range(10):
+            article = Article.objects.create(author=self.user2, title=f'Article {i}', content='Content')
+            Like.objects.create(user=self.user2, article=article)
+        like = Like.objects.create(user=self.user, article=self.article)
+        Like.objects.create(user=self.user2, article=self.article)
+        call_command('reconcilelikes', stdout=StringIO())  # counts the likes created above
+
+        url = reverse('article-list')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.auth_key)
+
+        # token, count of the paginator, articles with their like counts, likes of the user
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+
+        articles = {article['id']: article for article in response.data}
+        self.assertEqual(len(articles), 13)
+        self.assertEqual(articles[self.article.pk]['num_likes'], 2)
+        self.assertEqual(articles[self.article.pk]['like']['url'],
+                         'http://testserver' + reverse('like-detail', kwargs={'pk': like.pk}))
+        self.assertIsNone(articles[self.article2.pk]['like'])
+
+        with self.assertNumQueries(4):
+            response = self.client.get(url, data={'limit': 5})
+        self.assertEqual(len(response.data['results']), 5)
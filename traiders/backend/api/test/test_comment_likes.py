@@ -77,6 +77,7 @@ class ArticleCommentViewSetTests(APITestCase):
         # test if updated
         self.assertEqual(self.user in EquipmentComment.objects.get(pk=pk).liked_by.all(),
                          True)
+        self.assertEqual(response.data['num_likes'], 1)
 
     def test_equipment_comment_unlike(self):
         pk = self.equipment_comment.pk
@@ -97,6 +98,7 @@ class ArticleCommentViewSetTests(APITestCase):
         # test if updated
         self.assertEqual(self.user2 in EquipmentComment.objects.get(pk=pk).liked_by.all(),
                          False)
+        self.assertEqual(response.data['num_likes'], 0)
 
     def test_equipment_comment_try_liking_twice(self):
         pk = self.equipment_comment.pk
@@ -157,3 +159,34 @@ class ArticleCommentViewSetTests(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.auth_key2)
         response = self.client.patch(url, {'is_liked': False}, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_likers(self):
+        for i in range(3):
+            user = User.objects.create(username=f'liker{i}', email=f'liker{i}@example.com')
+            self.equipment_comment.liked_by.add(user)
+
+        url = reverse('equipmentcomment-likers', kwargs={'pk': self.equipment_comment.pk})
+        response = self.client.get(url, data={'limit': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([user['username'] for user in response.data['results']], ['liker0', 'liker1'])
+
+        response = self.client.get(reverse('equipmentcomment-detail', kwargs={'pk': self.equipment_comment.pk}))
+        self.assertEqual(response.data['liked_by'], 'http://testserver' + url)
+
+    def test_list_num_queries(self):
+        for i in range(10):
+            user = User.objects.create(username=f'commenter{i}', email=f'commenter{i}@example.com')
+            comment = EquipmentComment.objects.create(user=user, content='Looks good', equipment=self.equipment)
+            comment.liked_by.add(self.user, user)
+
+        url = reverse('equipmentcomment-list')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.auth_key)
+
+        # token, count of the paginator, comments with their users, equipments and whether the user likes them
+        with self.assertNumQueries(3):
+            response = self.client.get(url, data={'equipment': self.equipment.symbol})
+
+        self.assertEqual(len(response.data), 11)
+        self.assertEqual(sum(comment['is_liked'] for comment in response.data), 10)
@@ -0,0 +1,110 @@
+import decimal
+import uuid
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..models import *
+from ..conversion import ConversionGraph
+
+
+class ConversionGraphTestCase(TestCase):
+    def setUp(self):
+        self.dollar = Equipment.objects.create(symbol='USD', name='US Dollars', category='currency')
+        self.euro = Equipment.objects.create(symbol='EUR', name='Euros', category='currency')
+        self.lira = Equipment.objects.create(symbol='TRY', name='Turkish Liras', category='currency')
+        self.bitcoin = Equipment.objects.create(symbol='BTC', name='Bitcoin', category='crypto')
+
+        self._quote(self.lira, self.euro, '0.15')
+        self._quote(self.dollar, self.euro, '0.9')
+
+        self.graph = ConversionGraph(check_interval=0)
+
+    @staticmethod
+    def _quote(base, target, close):
+        Parity.objects.create(base_equipment=base, target_equipment=target,
+                              open=close, close=close, high=close, low=close)
+
+    def test_rate(self):
+        self.assertEqual(self.graph.rate(self.lira.pk, self.euro.pk), decimal.Decimal('0.15'))
+        self.assertEqual(self.graph.rate(self.euro.pk, self.euro.pk), 1)
+
+        # inverse of a quoted pair
+        self.assertEqual(self.graph.rate(self.euro.pk, self.dollar.pk), 1 / decimal.Decimal('0.9'))
+
+        # through EUR
+        self.assertAlmostEqual(self.graph.rate(self.lira.pk, self.dollar.pk), decimal.Decimal('0.15') / decimal.Decimal('0.9'))
+
+        self.assertIsNone(self.graph.rate(self.bitcoin.pk, self.dollar.pk))
+        self.assertDictEqual(self.graph.rates([self.lira.pk, self.bitcoin.pk], self.euro.pk),
+                             {self.lira.pk: decimal.Decimal('0.15')})
+
+    def test_quoted_reverse_pair(self):
+        self._quote(self.euro, self.dollar, '1.2')
+
+        # the quote of the reverse pair rather than the inverse
+        self.assertEqual(self.graph.rate(self.euro.pk, self.dollar.pk), decimal.Decimal('1.2'))
+        self.assertEqual(self.graph.rate(self.dollar.pk, self.euro.pk), decimal.Decimal('0.9'))
+
+    def _load(self):
+        # pairs of a new graph are read again once their stamps are read
+        self.graph.rate(self.lira.pk, self.dollar.pk)
+        self.graph.rate(self.lira.pk, self.dollar.pk)
+
+    def test_pair_changed(self):
+        self._load()
+
+        # changed in this process, without the signals
+        Parity.objects.filter(base_equipment=self.lira).update(close='0.16')
+        self.graph.pair_changed(self.lira.pk, self.euro.pk)
+
+        with mock.patch.object(self.graph, '_load') as load, self.assertNumQueries(1):
+            self.assertEqual(self.graph.rate(self.lira.pk, self.euro.pk), decimal.Decimal('0.16'))
+            self.assertEqual(self.graph.rate(self.dollar.pk, self.euro.pk), decimal.Decimal('0.9'))
+
+        load.assert_not_called()
+
+    def test_rate_changed_by_another_process(self):
+        self._load()
+
+        # only the pair is read again
+        self._quote(self.lira, self.euro, '0.16')
+
+        with mock.patch.object(self.graph, '_load') as load, self.assertNumQueries(1):
+            self.assertEqual(self.graph.rate(self.lira.pk, self.euro.pk), decimal.Decimal('0.16'))
+            self.assertEqual(self.graph.rate(self.dollar.pk, self.euro.pk), decimal.Decimal('0.9'))
+
+        load.assert_not_called()
+
+        with self.assertNumQueries(0):
+            self.graph.rate(self.lira.pk, self.euro.pk)
+
+    def test_pair_added_by_another_process(self):
+        self._load()
+
+        # new and removed pairs change the paths, the graph is loaded again
+        self._quote(self.bitcoin, self.dollar, '8000')
+        self.assertAlmostEqual(self.graph.rate(self.bitcoin.pk, self.euro.pk), 8000 * decimal.Decimal('0.9'))
+
+        Parity.objects.filter(base_equipment=self.bitcoin).delete()
+        self.assertIsNone(self.graph.rate(self.bitcoin.pk, self.euro.pk))
+
+    def test_changed_by_another_process(self):
+        self.graph.rate(self.lira.pk, self.dollar.pk)
+
+        LatestParity.objects.filter(base_equipment=self.lira).delete()
+        cache.set(ConversionGraph.version_key, uuid.uuid4().hex, None)
+
+        self.assertIsNone(self.graph.rate(self.lira.pk, self.dollar.pk))
+
+    def test_clear(self):
+        graph = ConversionGraph(check_interval=60)
+        graph.rate(self.lira.pk, self.dollar.pk)
+
+        # rolled back like the rows of a previous test, without a new version stamp
+        LatestParity.objects.filter(base_equipment=self.lira).delete()
+        self.assertIsNotNone(graph.rate(self.lira.pk, self.dollar.pk))
+
+        graph.clear()
+        self.assertIsNone(graph.rate(self.lira.pk, self.dollar.pk))
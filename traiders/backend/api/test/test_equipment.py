@@ -1,7 +1,12 @@
+import uuid
+
+from django.core.cache import cache
+from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
 
 from ..models import Equipment
+from ..equipment_registry import EquipmentRegistry
 
 
 class ParityViewsetTests(APITestCase):
@@ -35,3 +40,37 @@ class ParityViewsetTests(APITestCase):
         response = self.client.get(url)
         equipments = response.data
         self.assertEqual(len(equipments), 3)
+
+
+class EquipmentRegistryTestCase(TestCase):
+    def setUp(self):
+        self.dollar = Equipment.objects.create(symbol='USD', name='US Dollars', category='currency')
+        self.registry = EquipmentRegistry(check_interval=0)
+
+    def test_get(self):
+        self.registry.get('USD')  # loads the registry
+
+        # only the version stamp is checked, in the local memory cache of the tests
+        with self.assertNumQueries(0):
+            self.assertEqual(self.registry.get('USD'), self.dollar)
+            self.assertEqual(self.registry.get_by_pk(self.dollar.pk), self.dollar)
+
+        self.assertIsNone(self.registry.get('XXX'))
+
+        # missing symbols are remembered for a while
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.registry.get('XXX'))
+
+    def test_invalidated(self):
+        self.registry.get('USD')
+
+        # created in this process
+        euro = Equipment.objects.create(symbol='EUR', name='Euros', category='currency')
+        self.assertEqual(self.registry.get('EUR'), euro)
+
+        # renamed by another process
+        Equipment.objects.filter(pk=euro.pk).update(symbol='EURO')
+        cache.set(EquipmentRegistry.version_key, uuid.uuid4().hex, None)
+
+        self.assertEqual(self.registry.get('EURO'), euro)
+        self.assertIsNone(self.registry.get('EUR'))
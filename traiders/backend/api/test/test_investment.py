@@ -1,13 +1,20 @@
+import datetime
+
+from django.core.cache import cache
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 
 from ..models import *
+from ..conversion import graph
 
 
 class InvestmentandAPIViewTestCase(APITestCase):
     def setUp(self):
+        graph.clear()
+
         data = {
             'username': 'moneyhunter001',
             'first_name': 'Josh',
@@ -146,3 +153,189 @@ class InvestmentandAPIViewTestCase(APITestCase):
 
         # Make sure balance has not changed
         self.assertAlmostEqual(asset.amount, 1000)
+
+
+class ProfitLossTestCase(APITestCase):
+    def setUp(self):
+        graph.clear()  # edges of the previous tests, pks are reused after their rollbacks
+
+        self.user = User.objects.create(username='moneyhunter001', email='moneyhunter0@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+        self.dollar = Equipment.objects.create(symbol='USD', name='US Dollars', category='currency')
+        self.euro = Equipment.objects.create(symbol='EUR', name='Euros', category='currency')
+        self.lira = Equipment.objects.create(symbol='TRY', name='Turkish Liras', category='currency')
+
+        Parity.objects.create(base_equipment=self.lira, target_equipment=self.euro,
+                              open=1.0, close=1.5, high=1.6, low=0.9)
+
+    def _invest(self, base, target, base_amount, target_amount):
+        ManualInvestment.objects.create(user=self.user, base_equipment=base, target_equipment=target,
+                                        base_amount=base_amount, target_amount=target_amount)
+
+    def test_profits(self):
+        self._invest(self.lira, self.euro, 100, 200)  # 200 * 1 - 100 * 1.5
+        self._invest(self.euro, self.lira, 10, 20)  # 20 * 1.5 - 10 * 1
+
+        response = self.client.get(reverse('profitloss-list'), data={'equipment': 'EUR'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([item['profit'] for item in response.data['manual_investments']], [50, 20])
+        self.assertEqual(response.data['total_profit'], 70)
+        self.assertDictEqual(response.data['profits_by_equipment'], {'EUR': 50, 'TRY': 20})
+        self.assertListEqual(response.data['missing_rates'], [])
+
+    def test_missing_rates(self):
+        self._invest(self.lira, self.euro, 100, 200)
+        self._invest(self.dollar, self.euro, 100, 90)  # no USD/EUR parity
+
+        response = self.client.get(reverse('profitloss-list'), data={'equipment': 'EUR'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([item['profit'] for item in response.data['manual_investments']], [50, None])
+        self.assertEqual(response.data['total_profit'], 50)
+        self.assertListEqual(response.data['missing_rates'], ['USD'])
+
+    def test_cross_rates(self):
+        bitcoin = Equipment.objects.create(symbol='BTC', name='Bitcoin', category='crypto')
+        Parity.objects.create(base_equipment=bitcoin, target_equipment=self.lira,
+                              open=40000, close=40000, high=40000, low=40000)
+
+        self._invest(self.euro, bitcoin, 30000, 1)  # 1 * 40000 * 1.5 - 30000
+
+        response = self.client.get(reverse('profitloss-list'), data={'equipment': 'EUR'})
+
+        self.assertListEqual([item['profit'] for item in response.data['manual_investments']], [30000])
+        self.assertListEqual(response.data['missing_rates'], [])
+
+    def test_num_queries(self):
+        for _ in range(20):
+            self._invest(self.lira, self.euro, 100, 200)
+
+        url = reverse('profitloss-list')
+        self.client.get(url, data={'equipment': 'EUR'})  # loads the equipment registry
+
+        # token, manual investments, online investments, rates
+        with self.assertNumQueries(4):
+            self.client.get(url, data={'equipment': 'EUR'})
+
+
+class ValuationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()  # cached valuations of the previous tests
+        graph.clear()
+
+        self.user = User.objects.create(username='moneyhunter001', email='moneyhunter0@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+        self.dollar = Equipment.objects.create(symbol='USD', name='US Dollars', category='currency')
+        self.euro = Equipment.objects.create(symbol='EUR', name='Euros', category='currency')
+        self.lira = Equipment.objects.create(symbol='TRY', name='Turkish Liras', category='currency')
+
+        self.today = timezone.localdate()
+
+    def _close(self, days_ago, close, hour=12, base=None, target=None):
+        if days_ago == 0:
+            date = timezone.now()
+        else:
+            date = timezone.make_aware(datetime.datetime.combine(self.today - datetime.timedelta(days=days_ago),
+                                                                 datetime.time(hour)))
+
+        Parity.objects.create(base_equipment=base or self.lira, target_equipment=target or self.euro,
+                              open=close, close=close, high=close, low=close, date=date)
+
+    def _values(self, days=3):
+        response = self.client.get(reverse('valuation-list'), data={'equipment': 'EUR', 'days': days})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_values(self):
+        self._close(2, 0.5)
+        self._close(0, 0.25)
+
+        Asset.objects.create(user=self.user, equipment=self.lira, amount=1000)
+
+        # yesterday, 10 EUR to 100 TRY outside the platform
+        ManualInvestment.objects.create(user=self.user, base_equipment=self.euro, target_equipment=self.lira,
+                                        base_amount=10, target_amount=100,
+                                        date=self.today - datetime.timedelta(days=1))
+
+        # today, 200 TRY to 60 EUR on the platform
+        OnlineInvestment.objects.create(user=self.user, base_equipment=self.lira, target_equipment=self.euro,
+                                        base_amount=200, target_amount=60, date=self.today)
+
+        data = self._values()
+
+        self.assertListEqual([item['date'] for item in data['values']],
+                             [(self.today - datetime.timedelta(days=i)).isoformat() for i in (2, 1, 0)])
+
+        # 1000 * 0.5, 1100 * 0.5 - 10, 900 * 0.25 - 10 + 60
+        self.assertListEqual([item['value'] for item in data['values']], [500, 540, 275])
+        self.assertListEqual(data['missing_rates'], [])
+
+    def test_last_close_of_day(self):
+        self._close(5, 0.2)  # before the series, carried to its first day
+        self._close(1, 0.5, hour=12)
+        self._close(1, 0.4, hour=10)
+        self._close(0, 0.25)
+
+        Asset.objects.create(user=self.user, equipment=self.lira, amount=1000)
+
+        self.assertListEqual([item['value'] for item in self._values()['values']], [200, 500, 250])
+
+    def test_cross_rates(self):
+        bitcoin = Equipment.objects.create(symbol='BTC', name='Bitcoin', category='crypto')
+        self._close(2, 0.5)
+        self._close(2, 40000, base=bitcoin, target=self.lira)
+        self._close(1, 30000, base=bitcoin, target=self.lira)
+
+        # no BTC/EUR parity, converted through TRY with the closes of each day
+        Asset.objects.create(user=self.user, equipment=bitcoin, amount=1)
+
+        data = self._values()
+        self.assertListEqual([item['value'] for item in data['values']], [20000, 15000, 15000])
+        self.assertListEqual(data['missing_rates'], [])
+
+    def test_missing_rates(self):
+        self._close(1, 0.5)
+
+        Asset.objects.create(user=self.user, equipment=self.lira, amount=1000)
+        Asset.objects.create(user=self.user, equipment=self.dollar, amount=1000)  # no USD/EUR parity
+
+        data = self._values()
+
+        # no close before yesterday
+        self.assertListEqual([item['value'] for item in data['values']], [None, 500, 500])
+        self.assertListEqual(data['missing_rates'], ['USD'])
+
+    def test_cached(self):
+        self._close(1, 0.5)
+        Asset.objects.create(user=self.user, equipment=self.lira, amount=1000)
+
+        self.assertListEqual([item['value'] for item in self._values()['values']], [None, 500, 500])
+
+        # past days are cached. token, assets and investments of today, latest rates
+        with self.assertNumQueries(5):
+            self._values()
+
+        # a tick changes only today
+        self._close(0, 0.25)
+        self.assertListEqual([item['value'] for item in self._values()['values']], [None, 500, 250])
+
+        # a backfilled close of a past day
+        self._close(2, 0.4)
+        self.assertListEqual([item['value'] for item in self._values()['values']], [400, 500, 250])
+
+    def test_invalidation(self):
+        self._close(1, 0.5)
+        asset = Asset.objects.create(user=self.user, equipment=self.lira, amount=1000)
+
+        self.assertEqual(self._values(days=2)['values'][0]['value'], 500)
+
+        asset.amount = 2000
+        asset.save()
+        self.assertEqual(self._values(days=2)['values'][0]['value'], 1000)
+
+    def test_invalid_days(self):
+        response = self.client.get(reverse('valuation-list'), data={'equipment': 'EUR', 'days': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
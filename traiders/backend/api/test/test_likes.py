@@ -1,9 +1,12 @@
 
+from io import StringIO
+
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from ..models import Like, Article, User
+from ..models import Like, Article, User, ArticleComment
 
 
 class LikeViewSetTests(APITestCase):
@@ -72,6 +75,7 @@ class LikeViewSetTests(APITestCase):
         response = self.client.post(url, {'article': data}, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Like.objects.filter(article=self.article, user=self.user).count(), 1)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).like_count, 1)
 
     def test_delete(self):
         pk = self.like.pk
@@ -91,6 +95,7 @@ class LikeViewSetTests(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.auth_key)
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Article.objects.get(pk=self.article2.pk).like_count, 0)
 
     def test_retrieve(self):
         pk = self.like.pk
@@ -131,3 +136,15 @@ class LikeViewSetTests(APITestCase):
         user_url = 'http://testserver' + reverse('user-detail', kwargs={'pk': self.user2.pk})
         is_liked = like['user'] == user_url
         self.assertEqual(is_liked, True)
+
+    def test_reconcile(self):
+        comment = ArticleComment.objects.create(user=self.user, article=self.article, content='Agreed')
+        comment.liked_by.add(self.user, self.user2)
+        Article.objects.filter(pk=self.article.pk).update(like_count=5)
+
+        call_command('reconcilelikes', stdout=StringIO())
+
+        # likes created or deleted without the like paths are counted
+        self.assertEqual(Article.objects.get(pk=self.article.pk).like_count, 0)
+        self.assertEqual(Article.objects.get(pk=self.article2.pk).like_count, 1)
+        self.assertEqual(ArticleComment.objects.get(pk=comment.pk).like_count, 2)
@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -225,3 +227,44 @@ class OrderViewTestCase(APITestCase):
                                                      target_equipment=self.eq2).first()
         self.assertAlmostEqual(investment.base_amount, 100)
         self.assertAlmostEqual(investment.target_amount, 25)
+
+    def test_bulk_settlement(self):
+        def tick_with_orders(count, close):
+            for _ in range(count):
+                BuyOrder.objects.create(user=self.user, base_equipment=self.eq3, target_equipment=self.eq2,
+                                        buy_ratio=0.2, buy_amount=1)
+                StopLossOrder.objects.create(user=self.user, base_equipment=self.eq3, target_equipment=self.eq2,
+                                             sell_ratio=0.5, sell_amount=1)
+
+            with CaptureQueriesContext(connection) as queries:
+                Parity.objects.create(base_equipment=self.eq3, target_equipment=self.eq2,
+                                      open=close, high=close, close=close, low=close)
+
+            # investments are inserted one by one where the database cannot return ids from bulk inserts
+            return len([query for query in queries if not query['sql'].startswith('INSERT INTO "api_onlineinvestment"')])
+
+        # settle only buy orders, stop-losses are kept
+        tick_with_orders(1, 0.15)
+        self.assertFalse(BuyOrder.objects.exists())
+        self.assertEqual(StopLossOrder.objects.count(), 1)
+
+        # target asset exists now, number of queries does not depend on number of orders
+        few = tick_with_orders(2, 0.15)
+
+        many = tick_with_orders(20, 0.15)
+        self.assertEqual(few, many)
+        self.assertFalse(BuyOrder.objects.exists())
+
+        # settle only stop-losses
+        tick_with_orders(0, 0.6)
+        self.assertFalse(StopLossOrder.objects.exists())
+
+        self.assertEqual(OnlineInvestment.objects.filter(user=self.user).count(), 46)
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 46)
+
+        # every notification refers to a different investment
+        urls = Notification.objects.values_list('reference_url', flat=True)
+        self.assertEqual(len(set(urls)), 46)
+
+        target_asset = Asset.objects.get(user=self.user, equipment=self.eq2)
+        self.assertAlmostEqual(float(target_asset.amount), 23 * 0.15 + 23 * 0.6, places=2)
@@ -0,0 +1,87 @@
+from django.test import TestCase
+
+from ..models import *
+from ..orderbook import OrderBook
+
+
+class OrderBookTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='bookkeeper', email='bookkeeper@example.com')
+        self.eq1 = Equipment.objects.create(symbol='TRY', name='Turkish Liras', category='currency')
+        self.eq2 = Equipment.objects.create(symbol='EUR', name='Euros', category='currency')
+        self.book = OrderBook(BuyOrder, 'buy_ratio')
+
+    def _create_order(self, ratio):
+        return BuyOrder.objects.create(user=self.user,
+                                       base_equipment=self.eq1,
+                                       target_equipment=self.eq2,
+                                       buy_ratio=ratio,
+                                       buy_amount=10)
+
+    def test_crossed_orders(self):
+        low = self._create_order('0.1000')
+        mid = self._create_order('0.2000')
+        high = self._create_order('0.3000')
+
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.15')), [mid.pk, high.pk])
+        self.assertListEqual(self.book.below(self.eq1.pk, self.eq2.pk, self._ratio('0.2')), [low.pk])
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.3')), [])
+        self.assertListEqual(self.book.above(self.eq2.pk, self.eq1.pk, self._ratio('0')), [])
+
+    def test_sync(self):
+        order = self._create_order('0.2000')
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [order.pk])
+
+        # book is loaded now, so it is updated in place
+        pk = order.pk
+        order.delete()
+        self.book.remove(order)
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [])
+
+        order = self._create_order('0.2000')
+        self.book.add(order)
+        self.assertNotEqual(order.pk, pk)
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [order.pk])
+
+        with self.assertNumQueries(0):  # only the version stamp is read, from the local memory cache of the tests
+            self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1'))
+
+    def test_orders_from_other_processes(self):
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [])
+
+        # this book does not receive signals, like the book of another process
+        order = self._create_order('0.2000')
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [order.pk])
+
+    def test_orders_committed_late(self):
+        # a transaction of another process took this pk, and commits after a newer order was seen
+        late_pk = self._create_order('0.2000').pk
+        BuyOrder.objects.filter(pk=late_pk).delete()
+
+        order = self._create_order('0.3000')
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [order.pk])
+
+        BuyOrder.objects.create(pk=late_pk, user=self.user, base_equipment=self.eq1, target_equipment=self.eq2,
+                                buy_ratio='0.2000', buy_amount=10)
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [late_pk, order.pk])
+
+    def test_ratio_changed_by_other_processes(self):
+        order = self._create_order('0.2000')
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [order.pk])
+
+        # e.g. in the admin of another process
+        order.buy_ratio = '0.0500'
+        order.save()
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [])
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.01')), [order.pk])
+
+    def test_orders_deleted_by_other_processes(self):
+        order = self._create_order('0.2000')
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [order.pk])
+
+        BuyOrder.objects.filter(pk=order.pk).delete()
+        self.assertListEqual(self.book.above(self.eq1.pk, self.eq2.pk, self._ratio('0.1')), [])
+
+    @staticmethod
+    def _ratio(value):
+        return BuyOrder._meta.get_field('buy_ratio').to_python(value)
@@ -0,0 +1,91 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests as rq
+from django.test import SimpleTestCase
+
+from ..outbound import Client, CircuitOpenError
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Responds with the statuses in `server.statuses` in order, then with 200.
+    Waits `server.delay` seconds before responding.
+    """
+
+    def do_GET(self):
+        self.server.hits += 1
+        time.sleep(self.server.delay)
+
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = b'{}'
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out before the delay was over
+
+    def log_message(self, *args):
+        pass
+
+
+class ClientTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.hits = 0
+        self.server.delay = 0
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        self.host = f'127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retry(self):
+        client = Client(retries=2, backoff_factor=0)
+        self.server.statuses = [503, 503]
+
+        response = client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits, 3)
+        self.assertEqual(client.metrics()[self.host]['errors'], 0)
+
+    def test_timeout(self):
+        client = Client(timeout=(1, 0.1), retries=0)
+        self.server.delay = 0.3
+
+        # raised as a connection error once retries are exhausted
+        with self.assertRaises(rq.ConnectionError):
+            client.get(self.url)
+
+        self.assertEqual(client.metrics()[self.host]['errors'], 1)
+
+    def test_circuit(self):
+        client = Client(retries=0, failure_threshold=2, reset_timeout=0.2)
+        self.server.statuses = [500, 500]
+
+        client.get(self.url)
+        client.get(self.url)
+
+        # fails without reaching the host
+        with self.assertRaises(CircuitOpenError):
+            client.get(self.url)
+
+        self.assertEqual(self.server.hits, 2)
+        self.assertEqual(client.metrics()[self.host]['circuit'], 'open')
+
+        # tried again after the reset timeout, and closed on success
+        time.sleep(0.25)
+        self.assertEqual(client.get(self.url).status_code, 200)
+
+        metrics = client.metrics()[self.host]
+        self.assertEqual(metrics['circuit'], 'closed')
+        self.assertEqual((metrics['requests'], metrics['errors']), (3, 2))
@@ -3,6 +3,7 @@ from rest_framework.test import APITestCase
 from rest_framework.exceptions import ErrorDetail
 
 from ..models import Equipment, Parity
+from ..serializers import ParitySerializer, EquipmentSerializer
 
 
 class ParityViewsetTests(APITestCase):
@@ -91,6 +92,23 @@ class ParityViewsetTests(APITestCase):
         parities = response.data
         self.assertEqual(len(parities), 5)
 
+    def test_list_num_queries(self):
+        # count of the paginator, parities with their equipments
+        with self.assertNumQueries(2):
+            self.client.get('/parity/')
+
+    def test_nested_memo(self):
+        context = {'request': self.client.get('/parity/').wsgi_request}
+        parities = Parity.objects.order_by('pk')
+        data = ParitySerializer(parities, many=True, context=context).data
+
+        # each of the 4 equipments is rendered once for the 10 nested ones
+        self.assertEqual(len(context['nested_representations']), 4)
+
+        for parity, rendered in zip(parities, data):
+            self.assertEqual(rendered['base_equipment'],
+                             EquipmentSerializer(parity.base_equipment, context=context).data)
+
     def test_get_by_target(self):
         response = self.client.get('/parity/', data={"target_equipment": "USD"})
         parities = response.data
@@ -1,6 +1,8 @@
 from django.urls import reverse
 from rest_framework.test import APITestCase
-from ..models import Equipment, Parity
+from django.utils import timezone
+
+from ..models import Equipment, Parity, ParitySetting
 
 
 class ParityLatestViewsetTests(APITestCase):
@@ -37,6 +39,8 @@ class ParityLatestViewsetTests(APITestCase):
         euro.save()
         turkish_liras.save()
         bitcoin.save()
+        self.turkish_liras = turkish_liras
+        self.bitcoin = bitcoin
 
         parity1_data = {
             "base_equipment": euro,
@@ -107,3 +111,62 @@ class ParityLatestViewsetTests(APITestCase):
                                                             "target_equipment": "USD"})
         parity = response.data[0]
         self.assertAlmostEqual(float(parity['ratio']), 0.92)
+
+    def test_order(self):
+        # bulk_create does not trigger fetching the history of the setting
+        ParitySetting.objects.bulk_create([
+            ParitySetting(base_equipment=self.turkish_liras, target_equipment=self.bitcoin,
+                          update_rate=timezone.timedelta(hours=1), from_date=timezone.now(), order=-1)
+        ])
+
+        response = self.client.get(reverse('parity-latest-list'))
+        symbols = [(p['base_equipment']['symbol'], p['target_equipment']['symbol']) for p in response.data]
+        self.assertListEqual(symbols, [('TRY', 'BTC'), ('BTC', 'USD'), ('EUR', 'USD'), ('USD', 'TRY')])
+
+    def test_num_queries(self):
+        # count and page, independent of number of pairs
+        with self.assertNumQueries(2):
+            self.client.get(reverse('parity-latest-list'))
+
+        with self.assertNumQueries(2):
+            self.client.get(reverse('parity-latest-list'), data={'limit': 2})
+
+    def test_cached(self):
+        response = self.client.get(reverse('parity-latest-list'), data={'limit': 2})
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse('parity-latest-list'), data={'limit': 2})
+
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_not_modified(self):
+        etag = self.client.get(reverse('parity-latest-list'))['ETag']
+
+        response = self.client.get(reverse('parity-latest-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # a new parity changes the payload
+        Parity.objects.create(base_equipment=self.turkish_liras, target_equipment=self.bitcoin,
+                              open=0.5, close=0.5, high=0.5, low=0.5)
+
+        response = self.client.get(reverse('parity-latest-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        parity = next(p for p in response.data if p['base_equipment']['symbol'] == 'TRY')
+        self.assertAlmostEqual(float(parity['ratio']), 0.5)
+
+    def test_cached_per_query_string(self):
+        first = self.client.get(reverse('parity-latest-list'), data={'limit': 1, 'page': 'a'})
+        second = self.client.get(reverse('parity-latest-list'), data={'limit': 1, 'page': 'b'})
+
+        # parameters the view ignores are still kept in the links
+        self.assertIn('page=a', first.data['next'])
+        self.assertIn('page=b', second.data['next'])
+
+        # the order of the parameters does not matter
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse('parity-latest-list') + '?page=a&limit=1')
+
+        self.assertEqual(cached.data, first.data)
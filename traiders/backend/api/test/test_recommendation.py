@@ -0,0 +1,193 @@
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from ..models import *
+from .. import recommendations
+from .test_search import WINDOW_FUNCTIONS
+
+
+class RecommendationViewSetTests(APITestCase):
+    def setUp(self):
+        self.user = User(username='moneyhunter001', first_name='Josh', last_name='Mathews',
+                         email='moneyhunter0@example.com')
+        self.user.set_password('A7b8CdjK')
+        self.user.save()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+        self.writer = User(username='eurowriter', first_name='Jim', last_name='Kean', email='jk@natlanta.com')
+        self.writer.set_password('Th9oBsc7j')
+        self.writer.save()
+
+        self.dollar = Equipment.objects.create(symbol='USD', name='US Dollars', category='currency')
+        self.euro = Equipment.objects.create(symbol='EUR', name='Euros', category='currency')
+        self.lira = Equipment.objects.create(symbol='TRY', name='Turkish Liras', category='currency')
+
+        self.parity = Parity.objects.create(base_equipment=self.euro, target_equipment=self.dollar,
+                                            open=0.9, close=0.9, high=0.9, low=0.9)
+
+        self.article = Article.objects.create(author=self.writer, title='Euros rally',
+                                              content='The common currency rose against the dollar.')
+
+        Prediction.objects.create(user=self.user, base_equipment=self.euro, target_equipment=self.dollar,
+                                  direction=Prediction.WILL_INCREASE)
+
+    def _build(self):
+        # the first request marks the feed to be built by the cron
+        self.client.get('/recommendation/')
+        call_command('buildrecommendations')
+
+    def test_feed(self):
+        response = self.client.get('/recommendation/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['articles'], [])
+
+        call_command('buildrecommendations')
+
+        response = self.client.get('/recommendation/')
+        articles = response.data['articles']
+        self.assertEqual([article['id'] for article in articles], [self.article.pk])
+        self.assertEqual(articles[0]['messages'],
+                         ['You are receiving this since you made a prediction about EUR/USD in the past.'])
+
+        self.assertIn(self.parity.pk, [parity['id'] for parity in response.data['parities']])
+        self.assertIn(self.euro.pk, [equipment['id'] for equipment in response.data['equipments']])
+
+    def test_not_built_by_requests(self):
+        with mock.patch.object(recommendations, 'build_feed') as build_feed:
+            self.client.get('/recommendation/')
+
+        build_feed.assert_not_called()
+        self.assertTrue(RecommendationFeed.objects.get(user=self.user).dirty)
+
+        call_command('buildrecommendations')
+
+        # later requests only read the feed
+        with mock.patch.object(recommendations, 'build_feed') as build_feed:
+            response = self.client.get('/recommendation/')
+
+        build_feed.assert_not_called()
+        self.assertFalse(RecommendationFeed.objects.get(user=self.user).dirty)
+        self.assertEqual(len(response.data['articles']), 1)
+
+    def test_stale(self):
+        self._build()
+
+        Article.objects.create(author=self.writer, title='Euros fall', content='The common currency fell.')
+
+        # new content is included once the feed is stale
+        call_command('buildrecommendations')
+        self.assertEqual(len(self.client.get('/recommendation/').data['articles']), 1)
+
+        # served as it is, and built again by the cron
+        RecommendationFeed.objects.update(built_at=timezone.now() - recommendations.STALE_AFTER)
+        self.assertEqual(len(self.client.get('/recommendation/').data['articles']), 1)
+        self.assertTrue(RecommendationFeed.objects.get(user=self.user).dirty)
+
+        call_command('buildrecommendations')
+        self.assertEqual(len(self.client.get('/recommendation/').data['articles']), 2)
+
+    def test_incremental(self):
+        self._build()
+        self.assertFalse(RecommendationFeed.objects.get(user=self.user).dirty)
+
+        Following.objects.create(user_following=self.user, user_followed=self.writer)
+        self.assertTrue(RecommendationFeed.objects.get(user=self.user).dirty)
+
+        # not rebuilt until the builder runs
+        response = self.client.get('/recommendation/')
+        self.assertEqual(response.data['users'], [])
+
+        call_command('buildrecommendations')
+
+        response = self.client.get('/recommendation/')
+        self.assertEqual([user['id'] for user in response.data['users']], [self.writer.pk])
+        self.assertFalse(RecommendationFeed.objects.get(user=self.user).dirty)
+
+    def test_followed_events(self):
+        self.client.get('/recommendation/')
+
+        event = Event.objects.create(country='TR', calendarId='123456', category='Inflation', actual='1',
+                                     previous='2', sourceURL='https://example.com', importance=1,
+                                     event='Inflation Rate')
+        RecommendationFeed.objects.update(dirty=False)
+
+        event.followed_by.add(self.user)
+        self.assertTrue(RecommendationFeed.objects.get(user=self.user).dirty)
+
+    @skipUnless(WINDOW_FUNCTIONS, 'keywords are matched one by one without window functions')
+    @mock.patch.object(connection.features, 'supports_over_clause', True)
+    def test_num_queries(self):
+        recommendations.build_feed(self.user)  # creates the feed
+
+        with CaptureQueriesContext(connection) as few:
+            recommendations.build_feed(self.user)
+
+        self._add_interests(20)
+
+        # keywords are matched together, not one by one
+        with CaptureQueriesContext(connection) as many:
+            recommendations.build_feed(self.user)
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(Recommendation.objects.filter(user=self.user, entity='articles').count(), 21)
+
+    def _add_interests(self, count):
+        for i in range(count):
+            equipment = Equipment.objects.create(symbol=f'EQ{i}', name=f'Company{i}', category='stock')
+            Prediction.objects.create(user=self.user, base_equipment=equipment, target_equipment=self.dollar,
+                                      direction=Prediction.WILL_INCREASE)
+            Article.objects.create(author=self.writer, title=f'Company{i} earnings', content='Results.')
+
+    def _feed(self):
+        return list(Recommendation.objects.filter(user=self.user)
+                                          .order_by('entity', 'object_id')
+                                          .values_list('entity', 'object_id', 'score', 'messages'))
+
+    @mock.patch.object(connection.features, 'supports_over_clause', False)
+    def test_without_window_functions(self):
+        # e.g. SQLite before 3.25
+        recommendations.build_feed(self.user)
+
+        with CaptureQueriesContext(connection) as few:
+            recommendations.build_feed(self.user)
+
+        self._add_interests(20)
+
+        # a query per keyword and type
+        with CaptureQueriesContext(connection) as many:
+            recommendations.build_feed(self.user)
+
+        self.assertEqual(len(many) - len(few), 20 * 4)
+        self.assertEqual(Recommendation.objects.filter(user=self.user, entity='articles').count(), 21)
+
+        if WINDOW_FUNCTIONS:
+            feed = self._feed()
+            with mock.patch.object(connection.features, 'supports_over_clause', True):
+                recommendations.build_feed(self.user)
+
+            self.assertListEqual(self._feed(), feed)
+
+    def test_paginated(self):
+        Prediction.objects.create(user=self.user, base_equipment=self.lira, target_equipment=self.dollar,
+                                  direction=Prediction.WILL_DECREASE)
+        self._build()
+
+        response = self.client.get('/recommendation/', data={'limit': 1})
+        self.assertEqual(len(response.data['equipments']), 1)
+        # US Dollars is in both predictions
+        self.assertEqual(response.data['equipments'][0]['id'], self.dollar.pk)
+
+        response = self.client.get('/recommendation/', data={'limit': 1, 'offset': 1})
+        self.assertEqual(len(response.data['equipments']), 1)
+        self.assertNotEqual(response.data['equipments'][0]['id'], self.dollar.pk)
+
+        response = self.client.get('/recommendation/', data={'limit': 'a'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
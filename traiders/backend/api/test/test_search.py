@@ -1,6 +1,17 @@
+import sqlite3
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
 from rest_framework.test import APITestCase
 
 from ..models import *
+from .. import synonyms
+from .. import search_index
+
+# window functions are available, even if the backend of this Django version does not use them
+WINDOW_FUNCTIONS = connection.vendor != 'sqlite' or sqlite3.sqlite_version_info >= (3, 25, 0)
 
 
 class SearchViewSetTestCase(APITestCase):
@@ -127,3 +138,171 @@ class SearchViewSetTestCase(APITestCase):
         self.assertNotEquals(results['users'], [])
         kw_user = results['users'][0]
         self.assertEqual(self.user.username, kw_user['username'])
+
+    def test_search_pairs(self):
+        euro = Equipment.objects.get(symbol='EUR')
+        dollar = Equipment.objects.get(symbol='USD')
+
+        for ratio in [0.91, 0.92, 0.93]:
+            Parity.objects.create(base_equipment=euro, target_equipment=dollar,
+                                  open=ratio, close=ratio, high=ratio, low=ratio)
+
+        response = self.client.get('/search/', data={"keyword": "euros"})
+        parities = response.data['parities']
+
+        # each pair once, with its latest quote
+        self.assertEqual(len(parities), 1)
+        self.assertEqual(parities[0]['base_equipment']['symbol'], 'EUR')
+        self.assertAlmostEqual(float(parities[0]['ratio']), 0.93)
+
+    def test_search_paginated(self):
+        Equipment.objects.create(symbol='USDT', name='Tether', category='crypto')
+
+        response = self.client.get('/search/', data={"keyword": "usd", "limit": 1})
+        self.assertEqual([e['symbol'] for e in response.data['equipments']], ['USD'])
+
+        response = self.client.get('/search/', data={"keyword": "usd", "limit": 1, "offset": 1})
+        self.assertEqual([e['symbol'] for e in response.data['equipments']], ['USDT'])
+
+        response = self.client.get('/search/', data={"keyword": "usd", "limit": "one"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_related_word(self):
+        response = self.client.get('/search/', data={"keyword": "greenback"})
+        results = response.data
+        self.assertNotEquals(results['equipments'], [])
+        self.assertEqual(results['equipments'][0]['symbol'], 'USD')
+
+
+class SearchIndexTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='macro_analyst', email='analyst@example.com')
+        self.titled = Article.objects.create(author=self.author, title='Inflation outlook',
+                                             content='Prices keep rising.')
+        self.mentioned = Article.objects.create(author=self.author, title='Weekly notes',
+                                                content='Inflation was discussed briefly.')
+
+    def test_ranked(self):
+        # title is weighted more than content
+        self.assertListEqual(search_index.search(Article, [(1, 'inflation')], limit=5),
+                             [self.titled.pk, self.mentioned.pk])
+
+        # keywords are weighted by their scores
+        self.assertListEqual(search_index.search(Article, [(0.1, 'inflation'), (1, 'weekly')], limit=5),
+                             [self.mentioned.pk, self.titled.pk])
+
+    def test_paginated(self):
+        self.assertListEqual(search_index.search(Article, [(1, 'inflation')], limit=1, offset=1),
+                             [self.mentioned.pk])
+
+    def test_substrings(self):
+        self.assertListEqual(search_index.search(User, [(1, 'analyst')], limit=5), [self.author.pk])
+        self.assertListEqual(search_index.search(Article, [(1, 'analyst')], limit=5),
+                             [self.titled.pk, self.mentioned.pk])
+
+    def test_updated(self):
+        self.titled.title = 'Deflation outlook'
+        self.titled.save()
+        self.assertListEqual(search_index.search(Article, [(1, 'inflation')], limit=5), [self.mentioned.pk])
+
+        self.mentioned.delete()
+        self.assertListEqual(search_index.search(Article, [(1, 'inflation')], limit=5), [])
+
+    def test_user_updated(self):
+        # logins do not change the search terms
+        with self.assertNumQueries(1):
+            self.author.last_login = timezone.now()
+            self.author.save(update_fields=['last_login'])
+
+        # neither do other fields, found in the previous values
+        with self.assertNumQueries(2):
+            self.author.email = 'macro@example.com'
+            self.author.save()
+
+        self.author.username = 'chief_economist'
+        self.author.save()
+
+        self.assertListEqual(search_index.search(User, [(1, 'economist')], limit=5), [self.author.pk])
+        self.assertListEqual(search_index.search(User, [(1, 'analyst')], limit=5), [])
+
+        # articles are found by the new username of their author
+        self.assertListEqual(search_index.search(Article, [(1, 'economist')], limit=5),
+                             [self.titled.pk, self.mentioned.pk])
+        self.assertListEqual(search_index.search(Article, [(1, 'analyst')], limit=5), [])
+
+    def test_rebuild(self):
+        SearchTerm.objects.all().delete()
+        search_index.rebuild()
+        self.assertListEqual(search_index.search(Article, [(1, 'inflation')], limit=5),
+                             [self.titled.pk, self.mentioned.pk])
+
+    def test_num_queries(self):
+        keywords = [(1, word) for word in ['inflation', 'outlook', 'prices', 'notes', 'weekly']]
+
+        with self.assertNumQueries(1):
+            search_index.search(Article, keywords, limit=5)
+
+    def _over_clause(self):
+        """
+        (supports_over_clause, patch) of the paths of search_each this database can run
+        """
+        paths = [False, True] if WINDOW_FUNCTIONS else [False]
+        return [(supported, mock.patch.object(connection.features, 'supports_over_clause', supported))
+                for supported in paths]
+
+    def test_search_each(self):
+        keywords = ['inflation', 'weekly notes', 'analyst', 'gold']
+
+        for supported, patch in self._over_clause():
+            with self.subTest(supports_over_clause=supported), patch:
+                # a query per keyword without window functions
+                with self.assertNumQueries(1 if supported else len(keywords)):
+                    results = search_index.search_each(Article, keywords, limit=5)
+
+                # ranked as each keyword alone
+                for keyword in keywords:
+                    self.assertListEqual(results[keyword], search_index.search(Article, [(1, keyword)], limit=5))
+
+                results = search_index.search_each(Article, ['inflation'], limit=5, exclude=[self.titled.pk])
+                self.assertListEqual(results['inflation'], [self.mentioned.pk])
+
+    def test_search_each_stop_words(self):
+        for supported, patch in self._over_clause():
+            with self.subTest(supports_over_clause=supported), patch:
+                results = search_index.search_each(Article, ['the inflation', 'of the', 'on'], limit=5)
+
+                self.assertListEqual(results['the inflation'],
+                                     search_index.search(Article, [(1, 'inflation')], limit=5))
+                self.assertListEqual(results['of the'], [])
+                self.assertListEqual(results['on'], [])
+
+
+class SynonymsTestCase(SimpleTestCase):
+    def test_build_index(self):
+        index = synonyms.build_index([
+            '# comment',
+            'dollar, usd, greenback',
+            'currency, money, dollar',
+        ])
+
+        self.assertListEqual(index['dollar'], [[0.6667, 'usd'], [0.5, 'currency'],
+                                               [0.3333, 'greenback'], [0.3333, 'money']])
+        self.assertListEqual(index['greenback'], [[0.5, 'dollar'], [0.3333, 'usd']])
+
+    def test_find_closest(self):
+        kws = synonyms.find_closest('us dollars', top_k=3)
+
+        self.assertListEqual(kws[:2], [(1, 'us'), (1, 'dollars')])
+        self.assertEqual(len(kws), 5)
+        self.assertEqual(kws[2][0], 1)  # relative to the most related word
+        self.assertNotIn('dollars', [word for score, word in kws[2:]])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'operator classes of indexes are specific to PostgreSQL')
+class SearchTermIndexTestCase(TestCase):
+    def test_prefix_match_uses_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')  # tables are too small to prefer an index otherwise
+
+        plan = SearchTerm.objects.filter(entity='article', term__startswith='bitc').explain()
+        self.assertIn('api_searchterm_term_like', plan)
@@ -1,7 +1,7 @@
 from django.test import TestCase
 from django.utils.timezone import make_aware, datetime
 
-from ..models import Parity
+from ..models import Parity, LatestParity
 from ..models import Equipment
 
 
@@ -55,3 +55,38 @@ class TestEndofDayParityClean(TestCase):
         for i in range(1, 5):
             Parity.objects.create(**data, date=make_aware(datetime(2019, 1, i, 0)))
             self.assertEqual(Parity.objects.count(), i)
+
+
+class TestLatestParity(TestCase):
+    def setUp(self):
+        self.e1 = Equipment.objects.create(symbol='USD', name='U.S Dollar')
+        self.e2 = Equipment.objects.create(symbol='TRY', name='Turkish Liras')
+
+    def _create(self, close, date):
+        return Parity.objects.create(base_equipment=self.e1, target_equipment=self.e2,
+                                     open=close, close=close, high=close, low=close, date=date)
+
+    def test_newest_is_latest(self):
+        self.assertIsNone(LatestParity.get_parity(self.e1, self.e2))
+
+        self._create(1, make_aware(datetime(2019, 1, 8)))
+        newest = self._create(2, make_aware(datetime(2019, 1, 9)))
+
+        # an older parity does not replace the latest one
+        self._create(3, make_aware(datetime(2019, 1, 7)))
+
+        self.assertEqual(LatestParity.objects.count(), 1)
+        self.assertEqual(LatestParity.get_parity(self.e1, self.e2).pk, newest.pk)
+        self.assertIsNone(LatestParity.get_parity(self.e2, self.e1))
+
+    def test_single_query(self):
+        newest = self._create(2, make_aware(datetime(2019, 1, 9)))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(LatestParity.get_parity(self.e1, self.e2).pk, newest.pk)
+
+    def test_latest_deleted(self):
+        previous = self._create(1, make_aware(datetime(2019, 1, 8)))
+        self._create(2, make_aware(datetime(2019, 1, 9))).delete()
+
+        self.assertEqual(LatestParity.get_parity(self.e1, self.e2).pk, previous.pk)
@@ -0,0 +1,150 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import *
+from .. import alphavantage as av
+from ..timeseries import TimeSeries
+
+
+class UpdateParitiesTestCase(TestCase):
+    def setUp(self):
+        self.usd = Equipment.objects.create(symbol='USD', name='US Dollars', category='currency')
+        self.now = timezone.now()
+        self.backfilled_at = self.now - timezone.timedelta(hours=2)
+
+        currencies = [Equipment.objects.create(symbol=symbol, name=symbol, category='currency')
+                      for symbol in ['EUR', 'TRY', 'GBP', 'JPY']]
+
+        for currency in currencies:
+            ParitySetting.objects.create(base_equipment=currency, target_equipment=self.usd,
+                                         update_rate=timezone.timedelta(hours=1), from_date=self.now,
+                                         last_updated=self.backfilled_at, status=ParitySetting.DONE)
+
+    def _fetch_parities(self, base_symbol, base_category, target_symbol, target_category, outputsize):
+        return self.now, TimeSeries.from_rows([
+            {'date': self.now, 'open': '1.5', 'high': '1.5', 'low': '1.5', 'close': '1.5'}
+        ])
+
+    def test_update(self):
+        with mock.patch.object(av, 'fetch_parities', side_effect=self._fetch_parities) as fetch_parities:
+            call_command('updateparities', concurrency=3)
+
+        self.assertSetEqual({call[1]['outputsize'] for call in fetch_parities.call_args_list}, {'compact'})
+        self.assertEqual(Parity.objects.filter(target_equipment=self.usd).count(), 4)
+        self.assertFalse(ParitySetting.objects.filter(last_updated=self.backfilled_at).exists())
+
+        # not due yet
+        with mock.patch.object(av, 'fetch_parities', side_effect=self._fetch_parities) as fetch_parities:
+            call_command('updateparities', concurrency=3)
+
+        fetch_parities.assert_not_called()
+
+    def test_not_backfilled(self):
+        ParitySetting.objects.filter(base_equipment__symbol='EUR').update(last_updated=None,
+                                                                          status=ParitySetting.PENDING)
+
+        with mock.patch.object(av, 'fetch_parities', side_effect=self._fetch_parities) as fetch_parities:
+            call_command('updateparities', concurrency=3)
+
+        self.assertEqual(fetch_parities.call_count, 3)
+
+    def test_failures(self):
+        def fetch_parities(base_symbol, *args, **kwargs):
+            if base_symbol == 'TRY':
+                raise Exception('invalid response from AlphaVantage')
+            return self._fetch_parities(base_symbol, *args, **kwargs)
+
+        with mock.patch.object(av, 'fetch_parities', side_effect=fetch_parities):
+            call_command('updateparities', concurrency=2)
+
+        # other pairs are saved in their own transactions
+        updated = ParitySetting.objects.exclude(last_updated=self.backfilled_at)
+        self.assertSetEqual({ps.base_equipment.symbol for ps in updated}, {'EUR', 'GBP', 'JPY'})
+
+    def test_quota_exceeded(self):
+        with mock.patch.object(av, 'fetch_parities', side_effect=av.QuotaError) as fetch_parities:
+            call_command('updateparities', concurrency=1)
+
+        # the remaining pairs are skipped
+        self.assertEqual(fetch_parities.call_count, 1)
+        self.assertFalse(Parity.objects.exists())
+
+
+class BackfillTestCase(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.days = [self.now - timezone.timedelta(days=i) for i in range(3)]
+
+        usd = Equipment.objects.create(symbol='USD', name='US Dollars', category='currency')
+        eur = Equipment.objects.create(symbol='EUR', name='Euros', category='currency')
+
+        # from_date excludes the oldest day
+        self.ps = ParitySetting.objects.create(base_equipment=eur, target_equipment=usd,
+                                               update_rate=timezone.timedelta(hours=1), from_date=self.days[1])
+
+    def _fetch_parities(self, base_symbol, base_category, target_symbol, target_category, outputsize):
+        return self.now, TimeSeries.from_rows([
+            {'date': date, 'open': '2', 'high': '2', 'low': '2', 'close': '2'} for date in self.days
+        ])
+
+    def test_backfill(self):
+        self.assertEqual(self.ps.status, ParitySetting.PENDING)
+
+        with mock.patch.object(av, 'fetch_parities', side_effect=self._fetch_parities) as fetch_parities:
+            call_command('runbackfills', once=True)
+
+        self.assertEqual(fetch_parities.call_args[1]['outputsize'], 'full')
+
+        self.ps.refresh_from_db()
+        self.assertEqual(self.ps.status, ParitySetting.DONE)
+        self.assertEqual(self.ps.last_updated, self.now)
+
+        job = self.ps.backfill_job
+        self.assertEqual((job.attempts, job.fetched, job.inserted), (1, 3, 2))
+
+        self.assertEqual(Parity.objects.count(), 2)
+        self.assertEqual(LatestParity.get_parity(self.ps.base_equipment, self.ps.target_equipment).date, self.now)
+
+    def test_retry_on_quota_error(self):
+        with mock.patch.object(av, 'fetch_parities', side_effect=av.QuotaError):
+            call_command('runbackfills', once=True)
+
+        self.ps.refresh_from_db()
+        self.assertEqual(self.ps.status, ParitySetting.PENDING)
+        self.assertGreater(self.ps.backfill_job.run_after, self.now)
+
+        # postponed
+        with mock.patch.object(av, 'fetch_parities', side_effect=self._fetch_parities) as fetch_parities:
+            call_command('runbackfills', once=True)
+
+        fetch_parities.assert_not_called()
+
+        BackfillJob.objects.update(run_after=self.now)
+
+        with mock.patch.object(av, 'fetch_parities', side_effect=self._fetch_parities):
+            call_command('runbackfills', once=True)
+
+        self.ps.refresh_from_db()
+        self.assertEqual(self.ps.status, ParitySetting.DONE)
+        self.assertEqual(self.ps.backfill_job.attempts, 2)
+
+    def test_failed(self):
+        with mock.patch.object(av, 'fetch_parities', side_effect=Exception('invalid response from AlphaVantage')):
+            call_command('runbackfills', once=True)
+
+        # kept to be retried by setting the status back to pending
+        self.ps.refresh_from_db()
+        self.assertEqual(self.ps.status, ParitySetting.FAILED)
+        self.assertEqual(self.ps.backfill_job.error, 'invalid response from AlphaVantage')
+
+    def test_settings_without_jobs(self):
+        BackfillJob.objects.all().delete()
+
+        with mock.patch.object(av, 'fetch_parities', side_effect=self._fetch_parities):
+            call_command('runbackfills', once=True)
+
+        self.ps.refresh_from_db()
+        self.assertEqual(self.ps.status, ParitySetting.DONE)
@@ -0,0 +1,60 @@
+from django.utils import timezone
+from django.utils.timezone import datetime
+
+
+class TimeSeries:
+    """
+    Daily parities of a pair as columns, newest first.
+    Prices are kept as the strings of the response, they are converted to decimals by the database fields.
+    """
+    FIELDS = ('open', 'high', 'low', 'close')
+
+    def __init__(self, date, open, high, low, close):
+        self.date = date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+
+    def __len__(self):
+        return len(self.date)
+
+    def row(self, index):
+        return {
+            'date': self.date[index],
+            'open': self.open[index],
+            'high': self.high[index],
+            'low': self.low[index],
+            'close': self.close[index]
+        }
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls(*[[row[field] for row in rows] for field in ('date',) + cls.FIELDS])
+
+
+def parse_dates(texts):
+    """
+    'YYYY-MM-DD' or 'YYYY-MM-DD hh:mm:ss' strings to aware datetimes in the current time zone
+    """
+    tz = timezone.get_current_timezone()
+
+    # fromisoformat is much faster than strptime, and a fixed offset (e.g. UTC) needs no localization
+    if tz.utcoffset(None) is not None:
+        return [datetime.fromisoformat(text).replace(tzinfo=tz) for text in texts]
+
+    return [timezone.make_aware(datetime.fromisoformat(text), tz) for text in texts]
+
+
+def parse_time_series(time_series, keys):
+    """
+    Columns of an AlphaVantage time series. `keys` maps the fields to the keys of the response,
+    e.g. {'open': '1. open', ...}
+    """
+    try:
+        columns = [[rates[keys[field]] for rates in time_series.values()] for field in TimeSeries.FIELDS]
+        dates = parse_dates(time_series.keys())
+    except (KeyError, TypeError, ValueError):
+        raise Exception('invalid response from AlphaVantage')
+
+    return TimeSeries(dates, *columns)
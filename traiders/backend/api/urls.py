@@ -25,6 +25,7 @@ router.register(r'buyorder', BuyOrderViewSet, basename='buyorder')
 router.register(r'stoplossorder', StopLossOrderViewSet, basename='stoplossorder')
 router.register(r'search', SearchViewSet, basename='search')
 router.register(r'profitloss', ProfitLossViewSet, basename='profitloss')
+router.register(r'valuation', ValuationViewSet, basename='valuation')
 router.register(r'recommendation', RecommendationViewSet, basename='recommendation')
 router.register(r'portfolio', PortfolioViewSet, basename='portfolio')
 router.register(r'portfolioitem', PortfolioItemViewSet, basename='portfolioitem')
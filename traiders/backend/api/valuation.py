@@ -0,0 +1,206 @@
+import datetime
+import decimal
+from collections import defaultdict
+
+from django.db.models import Q, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Asset, ManualInvestment, OnlineInvestment, Parity
+from .conversion import graph
+from . import profitloss
+from . import response_cache
+
+# days before the first day of a series searched for its opening closes, e.g. over a weekend
+LOOKBACK_DAYS = 7
+
+
+def _day_index(date, start, days):
+    """
+    index of a date in a series of `days` days from `start`, clipped to [0, days]
+    """
+    return min(max((date - start).days, 0), days)
+
+
+def holdings(user, start, days):
+    """
+    equipment pk -> amounts held by the user at the end of each day of the series.
+
+    Assets on the platform are rolled back from their current balances by undoing the later
+    online investments, deposits are taken as held from the beginning. Manual investments are
+    positions outside the platform, added from their dates on. Each investment changes the
+    amounts of two equipments for a range of days, the ranges are marked at their ends and
+    summed up once per equipment.
+    """
+    changes = defaultdict(lambda: [decimal.Decimal(0)] * (days + 1))
+
+    for equipment_id, amount, on_hold in (Asset.objects.filter(user=user)
+                                                       .values_list('equipment', 'amount', 'on_hold_for_investment')):
+        changes[equipment_id][0] += amount + on_hold
+
+    # days before the investment did not have it yet
+    for base_id, target_id, base_amount, target_amount, date in (
+            OnlineInvestment.objects.filter(user=user, date__gt=start)
+                                    .values_list('base_equipment', 'target_equipment', 'base_amount',
+                                                 'target_amount', 'date')):
+        end = _day_index(date, start, days)
+        changes[base_id][0] += base_amount
+        changes[base_id][end] -= base_amount
+        changes[target_id][0] -= target_amount
+        changes[target_id][end] += target_amount
+
+    for base_id, target_id, base_amount, target_amount, date in (
+            ManualInvestment.objects.filter(user=user, date__lt=start + datetime.timedelta(days=days))
+                                    .values_list('base_equipment', 'target_equipment', 'base_amount',
+                                                 'target_amount', 'date')):
+        begin = _day_index(date, start, days)
+        changes[base_id][begin] -= base_amount
+        changes[target_id][begin] += target_amount
+
+    result = {}
+    for equipment_id, column in changes.items():
+        amounts = []
+        amount = decimal.Decimal(0)
+        for change in column[:days]:
+            amount += change
+            amounts.append(amount)
+
+        if any(amounts):
+            result[equipment_id] = amounts
+
+    return result
+
+
+def _daily_closes(pairs, start, days):
+    """
+    (base pk, target pk) -> {day index: last close of the day} of the pairs in the series, and in the
+    LOOKBACK_DAYS before it for the first day. The last parity of each pair and day is found in the
+    database, only those are read.
+    """
+    if not pairs:
+        return {}
+
+    first = timezone.make_aware(datetime.datetime.combine(start - datetime.timedelta(days=LOOKBACK_DAYS),
+                                                          datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(start + datetime.timedelta(days=days), datetime.time.min))
+
+    matches = Q()
+    for base, target in pairs:
+        matches |= Q(base_equipment=base, target_equipment=target)
+
+    parities = Parity.objects.filter(matches, date__gte=first, date__lt=end)
+    last_of_days = (
+        parities.annotate(day=TruncDate('date'))
+                .values('base_equipment', 'target_equipment', 'day')
+                .annotate(last=Max('date'))
+                .order_by()
+                .values('last')
+    )
+
+    closes = defaultdict(dict)
+    for base, target, date, close in (parities.filter(date__in=last_of_days)
+                                              .order_by('date')
+                                              .values_list('base_equipment', 'target_equipment', 'date', 'close')):
+        # a pair may have a parity at the time of the last one of another pair, the later one of the day is kept
+        closes[(base, target)][_day_index(timezone.localtime(date).date(), start, days)] = close
+
+    return closes
+
+
+def daily_rates(equipment_ids, equipment, start, days):
+    """
+    equipment pk -> rates converting it to `equipment` at the end of each day of the series.
+
+    Equipments are converted along their paths in the conversion graph, each step at the last
+    close of its pair on the day, or at the inverse of the close of the reverse pair if the pair
+    has none that day. Closes are carried to the following days until the next one, days before
+    the first close of a step are None. Equipments not connected to `equipment` are left out.
+    """
+    paths = graph.paths(equipment_ids, equipment.pk)
+    steps = {step for path in paths.values() for step in zip(path, path[1:])}
+    closes = _daily_closes(steps | {(quote, base) for base, quote in steps}, start, days)
+
+    step_rates = {}
+    for base, quote in steps:
+        direct = closes.get((base, quote), {})
+        inverse = closes.get((quote, base), {})
+
+        column = []
+        rate = None
+        for index in range(days):
+            if index in direct:
+                rate = direct[index]
+            elif inverse.get(index):  # a zero rate has no inverse
+                rate = 1 / inverse[index]
+            column.append(rate)
+
+        step_rates[(base, quote)] = column
+
+    rates = {}
+    for source, path in paths.items():
+        column = [decimal.Decimal(1)] * days
+        for step in zip(path, path[1:]):
+            column = [None if rate is None or step_rate is None else rate * step_rate
+                      for rate, step_rate in zip(column, step_rates[step])]
+
+        rates[source] = column
+
+    return rates
+
+
+def _history(user, equipment, start, days):
+    """
+    (values, missing) of the series from `start`, see `valuation`
+    """
+    if days == 0:
+        return [], set()
+
+    amounts = holdings(user, start, days)
+    rates = daily_rates(set(amounts), equipment, start, days)
+
+    values = [decimal.Decimal(0)] * days
+    for equipment_id, column in amounts.items():
+        if equipment_id not in rates:
+            continue
+
+        for index, (amount, rate) in enumerate(zip(column, rates[equipment_id])):
+            if values[index] is None or not amount:
+                continue
+            values[index] = None if rate is None else values[index] + amount * rate
+
+    return values, set(amounts) - rates.keys()
+
+
+def current_value(user, equipment):
+    """
+    (value, missing) of the assets of the user now, at the latest rates as profits are computed
+    """
+    amounts = {equipment_id: column[0] for equipment_id, column in holdings(user, timezone.localdate(), 1).items()}
+    rates = profitloss.conversion_rates(set(amounts), equipment)
+
+    value = sum((amount * rates[equipment_id] for equipment_id, amount in amounts.items() if equipment_id in rates),
+                decimal.Decimal(0))
+
+    return value, set(amounts) - rates.keys()
+
+
+def valuation(user, equipment, days):
+    """
+    Worth of the assets of the user in terms of an equipment at the end of each of the last
+    `days` days, today's at the latest rates. Returns (dates, values, missing) where values are
+    None for the days an equipment held had no close yet, and missing are the pks of the
+    equipments held that are not connected to `equipment`. Those are left out of the values.
+
+    The days before today are cached per user until the assets or investments of the user,
+    a parity of a past day or the quoted pairs change. Ticks of today change only today's value.
+    """
+    today = timezone.localdate()
+    start = today - datetime.timedelta(days=days - 1)
+    dates = [start + datetime.timedelta(days=index) for index in range(days)]
+
+    past, past_missing = response_cache.valuations.cached([equipment.pk, start.isoformat(), days],
+                                                          lambda: _history(user, equipment, start, days - 1),
+                                                          scope=user.pk)
+    value, missing = current_value(user, equipment)
+
+    return dates, past + [value], past_missing | missing
@@ -9,7 +9,7 @@ from .likes import LikeViewSet
 from .following import FollowingViewSet
 from .event import EventViewSet
 from .prediction import PredictionViewSet
-from .investment import ManualInvestmentViewSet, AssetViewSet, OnlineInvestmentViewSet, ProfitLossViewSet
+from .investment import ManualInvestmentViewSet, AssetViewSet, OnlineInvestmentViewSet, ProfitLossViewSet, ValuationViewSet
 from .order import BuyOrderViewSet, StopLossOrderViewSet
 from .verify_email import verify_email
 from .portfolio import PortfolioViewSet, PortfolioItemViewSet
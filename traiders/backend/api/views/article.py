@@ -22,6 +22,9 @@ class ArticleViewSet(mixins.CreateModelMixin,
     queryset = Article.objects.all()
     pagination_class = LimitOffsetPagination
 
+    def get_queryset(self):
+        return ArticleSerializer.setup_eager_loading(super().get_queryset(), self.request.user)
+
     def check_object_permissions(self, request, article):
         # Another user can only retrieve; cannot update, delete, update or partial_update
         if self.action != 'retrieve' and request.user != article.author:
@@ -1,5 +1,7 @@
+from django.db.models import Exists, OuterRef
 from rest_framework.viewsets import GenericViewSet
 from rest_framework import mixins
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
@@ -8,11 +10,46 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.pagination import LimitOffsetPagination
 
 from ..models import ArticleComment, EquipmentComment
-from ..serializers import ArticleCommentSerializer, EquipmentCommentSerializer
+from ..serializers import ArticleCommentSerializer, EquipmentCommentSerializer, UserSerializer
 from ..filters import ArticleCommentFilterSet, EquipmentCommentFilterSet
 
 
-class ArticleCommentViewSet(mixins.CreateModelMixin,
+class LikersPagination(LimitOffsetPagination):
+    default_limit = 50
+    max_limit = 200
+
+
+class CommentQuerysetMixin:
+    """
+    Reads the related objects of comments and whether the user likes them along with the comments,
+    and lists the users liking a comment page by page
+    """
+    related_fields = ('user',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related(*self.related_fields)
+
+        user = self.request.user
+        if user.is_authenticated:
+            model = queryset.model
+            likes = model.liked_by.through.objects.filter(**{model._meta.model_name: OuterRef('pk')}, user=user)
+            queryset = queryset.annotate(viewer_liked=Exists(likes))
+
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def likers(self, request, pk=None):
+        comment = self.get_object()
+
+        paginator = LikersPagination()
+        page = paginator.paginate_queryset(comment.liked_by.order_by('pk'), request, view=self)
+        serializer = UserSerializer(page, many=True, context=self.get_serializer_context())
+
+        return paginator.get_paginated_response(serializer.data)
+
+
+class ArticleCommentViewSet(CommentQuerysetMixin,
+                            mixins.CreateModelMixin,
                             mixins.RetrieveModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.DestroyModelMixin,
@@ -41,7 +78,8 @@ class ArticleCommentViewSet(mixins.CreateModelMixin,
             raise PermissionDenied
 
 
-class EquipmentCommentViewSet(mixins.CreateModelMixin,
+class EquipmentCommentViewSet(CommentQuerysetMixin,
+                              mixins.CreateModelMixin,
                               mixins.RetrieveModelMixin,
                               mixins.UpdateModelMixin,
                               mixins.DestroyModelMixin,
@@ -53,6 +91,7 @@ class EquipmentCommentViewSet(mixins.CreateModelMixin,
     permission_classes = (IsAuthenticatedOrReadOnly,)
     serializer_class = EquipmentCommentSerializer
     queryset = EquipmentComment.objects.all()
+    related_fields = ('user', 'equipment')
     filter_backends = [DjangoFilterBackend]
     filterset_class = EquipmentCommentFilterSet
     pagination_class = LimitOffsetPagination
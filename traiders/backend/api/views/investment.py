@@ -9,6 +9,12 @@ from rest_framework.exceptions import ValidationError
 from ..models import *
 from ..serializers import *
 from ..filters import *
+from ..equipment_registry import equipments
+from .. import profitloss
+from .. import valuation
+
+DEFAULT_VALUATION_DAYS = 30
+MAX_VALUATION_DAYS = 365
 
 
 class ManualInvestmentViewSet(mixins.ListModelMixin,
@@ -61,35 +67,9 @@ class AssetViewSet(mixins.ListModelMixin,
 
 class ProfitLossViewSet(GenericViewSet):
     """
-    View user success rates
+    View profits and losses of the investments of the user in terms of an equipment
     """
 
-    @staticmethod
-    def _get_profit(investment, equipment):
-        base_eq = investment.base_equipment
-        target_eq = investment.target_equipment
-        base_amount = investment.base_amount
-        target_amount = investment.target_amount
-
-        # If the sold equipment is the same as the requested equipment, ratio is 1.
-        if base_eq == equipment:
-            base_ratio = 1
-        else:
-            base_ratio = Parity.objects.order_by('-date').filter(base_equipment=base_eq,
-                                                                 target_equipment=equipment).first().close
-
-        # If the bought equipment is the same as the requested, ratio is 1.
-        if target_eq == equipment:
-            target_ratio = 1
-        else:
-            target_ratio = Parity.objects.order_by('-date').filter(base_equipment=target_eq,
-                                                                   target_equipment=equipment).first().close
-
-        current = target_amount * target_ratio
-        would_be = base_amount * base_ratio
-        profit = float(current - would_be)
-        return profit
-
     def get_queryset(self):
         return (
             ManualInvestment.objects.all()
@@ -102,38 +82,99 @@ class ProfitLossViewSet(GenericViewSet):
 
     def list(self, request):
         data = {}
-        manuals = ManualInvestment.objects.filter(user=self.request.user).order_by('pk')
-        onlines = OnlineInvestment.objects.filter(user=self.request.user).order_by('pk')
 
         if 'equipment' not in self.request.query_params:
             raise ValidationError('Please provide an equipment to see the profit/loss')
 
         equipment = self.request.query_params['equipment']
-        equipment = Equipment.objects.filter(symbol=equipment).first()
+        equipment = equipments.get(equipment)
         if not equipment:
             raise serializers.ValidationError('Equipment not found')
 
-        manual_profits = 0
-        online_profits = 0
+        related = ('user', 'base_equipment', 'target_equipment')
+        manuals = list(ManualInvestment.objects.filter(user=self.request.user).select_related(*related).order_by('pk'))
+        onlines = list(OnlineInvestment.objects.filter(user=self.request.user).select_related(*related).order_by('pk'))
 
-        context = self.get_serializer_context()
+        # all rates are read at once, investments with an equipment that has no rate have no profit
+        all_profits, missing = profitloss.profits(manuals + onlines, equipment)
+        manual_profits, online_profits = all_profits[:len(manuals)], all_profits[len(manuals):]
 
-        data['manual_investments'] = []
-        for manual in manuals:
-            profit = self._get_profit(manual, equipment)
-            investment = ManualInvestmentSerializer(manual, context=context).data
-            data['manual_investments'].append({'investment': investment, 'profit': profit})
-            manual_profits += profit
+        def as_float(profit):
+            return None if profit is None else float(profit)
 
-        data['online_investments'] = []
-        for online in onlines:
-            profit = self._get_profit(online, equipment)
-            investment = OnlineInvestmentSerializer(online, context=context).data
-            data['online_investments'].append({'investment': investment, 'profit': profit})
-            online_profits += profit
+        def total(profits):
+            return float(sum(profit for profit in profits if profit is not None))
 
-        data['manual_investment_profits'] = manual_profits
-        data['online_investment_profits'] = online_profits
-        data['total_profit'] = manual_profits + online_profits
+        context = self.get_serializer_context()
+
+        data['manual_investments'] = [
+            {'investment': investment, 'profit': as_float(profit)}
+            for investment, profit in zip(ManualInvestmentSerializer(manuals, many=True, context=context).data,
+                                          manual_profits)
+        ]
+        data['online_investments'] = [
+            {'investment': investment, 'profit': as_float(profit)}
+            for investment, profit in zip(OnlineInvestmentSerializer(onlines, many=True, context=context).data,
+                                          online_profits)
+        ]
+
+        data['manual_investment_profits'] = total(manual_profits)
+        data['online_investment_profits'] = total(online_profits)
+        data['total_profit'] = total(all_profits)
+
+        # profits by the bought equipment
+        by_equipment = {}
+        for investment, profit in zip(manuals + onlines, all_profits):
+            if profit is not None:
+                symbol = investment.target_equipment.symbol
+                by_equipment[symbol] = by_equipment.get(symbol, 0) + profit
+
+        data['profits_by_equipment'] = {symbol: float(profit) for symbol, profit in sorted(by_equipment.items())}
+        data['missing_rates'] = sorted(equipments.get_by_pk(pk).symbol for pk in missing)
 
         return Response(data)
+
+
+class ValuationViewSet(GenericViewSet):
+    """
+    View the worth of the assets of the user in terms of an equipment at the end of each of the last days
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return (
+            Asset.objects.all()
+        )
+
+    class serializer_class(serializers.Serializer):  # this is just for schema generation, not used
+        date = serializers.DateField()
+        value = serializers.FloatField()
+
+    def list(self, request):
+        params = self.request.query_params
+
+        if 'equipment' not in params:
+            raise ValidationError('Please provide an equipment to see the valuation')
+
+        equipment = equipments.get(params['equipment'])
+        if not equipment:
+            raise serializers.ValidationError('Equipment not found')
+
+        try:
+            days = int(params.get('days', DEFAULT_VALUATION_DAYS))
+        except ValueError:
+            raise ValidationError('days should be an integer')
+
+        if not 1 <= days <= MAX_VALUATION_DAYS:
+            raise ValidationError(f'days should be between 1 and {MAX_VALUATION_DAYS}')
+
+        dates, values, missing = valuation.valuation(self.request.user, equipment, days)
+
+        return Response({
+            'equipment': equipment.symbol,
+            'values': [
+                {'date': date.isoformat(), 'value': None if value is None else float(value)}
+                for date, value in zip(dates, values)
+            ],
+            'missing_rates': sorted(equipments.get_by_pk(pk).symbol for pk in missing)
+        })
@@ -1,9 +1,13 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from rest_framework.viewsets import GenericViewSet
 from rest_framework import mixins
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.pagination import LimitOffsetPagination
 
+from ..models.article import Article
 from ..models.likes import Like
 from ..serializers.likes import LikeSerializer
 
@@ -17,6 +21,16 @@ class LikeViewSet(mixins.CreateModelMixin,
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = LimitOffsetPagination
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        like = serializer.save()
+        Article.objects.filter(pk=like.article_id).update(like_count=F('like_count') + 1)
+
+    @transaction.atomic
+    def perform_destroy(self, like):
+        like.delete()
+        Article.objects.filter(pk=like.article_id).update(like_count=Greatest(F('like_count') - 1, 0))
+
     def check_object_permissions(self, request, like):
         # Another user can only retrieve; cannot delete
         if self.action != 'retrieve' and request.user != like.user:
@@ -1,16 +1,18 @@
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.pagination import LimitOffsetPagination
-from django.db.models import When, Case
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
-from ..models import Parity, Equipment, ParitySetting
+from ..models import Parity, LatestParity, ParitySetting
 from ..serializers import ParitySerializer
 from ..filters import ParityFilterSet
+from .. import response_cache
 
 
 class ParityViewSet(ReadOnlyModelViewSet):
     serializer_class = ParitySerializer
-    queryset = Parity.objects.all()
+    queryset = Parity.objects.select_related('base_equipment', 'target_equipment')
     filter_backends = [DjangoFilterBackend]
     filterset_class = ParityFilterSet
     pagination_class = LimitOffsetPagination
@@ -23,28 +25,24 @@ class ParityLatestViewSet(ReadOnlyModelViewSet):
     pagination_class = LimitOffsetPagination
 
     def get_queryset(self):
-        latest_parities = []
-
-        distinct_id_pairs = Parity.objects.order_by().values_list('base_equipment', 'target_equipment').distinct()
-
-        for base, target in distinct_id_pairs:
-            parity = Parity.objects.order_by('-date').filter(base_equipment_id=base,
-                                                             target_equipment_id=target).first()
-
-            parity_setting = ParitySetting.objects.filter(base_equipment=parity.base_equipment,
-                                                          target_equipment=parity.target_equipment).first()
-            order = 0
-            if parity_setting:
-                order = parity_setting.order
-
-            latest_parities.append((order, parity.base_equipment.symbol, parity.target_equipment.symbol, parity.id))
-
-        latest_parities.sort()
-        if latest_parities:
-            parity_ids = list(zip(*latest_parities))[-1]
-        else:
-            parity_ids = []
-
-        preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(parity_ids)])
-
-        return Parity.objects.filter(id__in=parity_ids).order_by(preserved_order)
+        # parities are ordered by the order of their settings (0 if there is none), then by symbols
+        setting_order = (
+            ParitySetting.objects
+                         .filter(base_equipment=OuterRef('base_equipment'), target_equipment=OuterRef('target_equipment'))
+                         .order_by('pk')
+                         .values('order')[:1]
+        )
+
+        return (
+            Parity.objects
+                  .filter(pk__in=LatestParity.objects.values('parity'))
+                  .select_related('base_equipment', 'target_equipment')
+                  .annotate(setting_order=Coalesce(Subquery(setting_order), 0))
+                  .order_by('setting_order', 'base_equipment__symbol', 'target_equipment__symbol')
+        )
+
+    def list(self, request, *args, **kwargs):
+        # the list changes only when parities, settings or equipments are saved, see cache_signals
+        return response_cache.latest_parities.respond(
+            request, lambda: super(ParityLatestViewSet, self).list(request, *args, **kwargs).data
+        )
@@ -6,8 +6,9 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import serializers
 
-from ..models import User, Following, Prediction, Equipment
+from ..models import User, Following, Prediction
 from ..serializers import EquipmentSerializer, UserSerializer
+from ..equipment_registry import equipments
 
 
 class UserViewSet(mixins.CreateModelMixin,
@@ -55,8 +56,8 @@ class UserSuccessViewSet(GenericViewSet):
 
         success_list = []
         for item in queryset:
-            base_eq = Equipment.objects.get(pk=item['base_equipment'])
-            target_eq = Equipment.objects.get(pk=item['target_equipment'])
+            base_eq = equipments.get_by_pk(item['base_equipment'])
+            target_eq = equipments.get_by_pk(item['target_equipment'])
             user = User.objects.get(pk=item['user'])
 
             context = self.get_serializer_context()
@@ -3,5 +3,6 @@
 while :
 do
 	python manage.py updateparities;
+	python manage.py buildrecommendations;
 	sleep 60;
 done
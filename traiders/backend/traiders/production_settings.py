@@ -23,6 +23,14 @@ DATABASES = {
     }
 }
 
+# gunicorn workers and the cron container share the cache through postgres
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_table',
+    }
+}
+
 STATIC_URL = '/static/'
 STATIC_ROOT = '/static/'
 
@@ -87,6 +87,27 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# shared between the server and the cron commands, which invalidate cached responses and
+# version stamps of the server. production shares a database cache instead, see production_settings
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    }
+}
+
+# tests run with an empty cache of their own, see traiders/test_runner.py
+TEST_RUNNER = 'traiders.test_runner.TestRunner'
+
+# Related words of search, see api/synonyms.py
+SYNONYM_INDEX_PATH = os.environ.get('SYNONYM_INDEX_PATH', os.path.join(BASE_DIR, 'synonym_index.json'))
+
+# add related words of Datamuse to the index, fetched in the background and cached
+SYNONYM_DATAMUSE_REFRESH = os.environ.get('SYNONYM_DATAMUSE_REFRESH', '') == '1'
+
 AUTH_USER_MODEL = 'api.User'
 
 # Password validation